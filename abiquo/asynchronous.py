@@ -0,0 +1,95 @@
+# Copyright (C) 2008 Abiquo Holdings S.L.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from abiquo.client import Abiquo, ObjectDto
+from abiquo.transport import Transport
+
+class AsyncAbiquo(Abiquo):
+    """ Non-blocking client whose requests return futures of (code, dto) tuples.
+
+    All the nodes and objects derived from the client share its transport and its
+    pool of workers, so up to 'workers' requests are in flight at the same time.
+    On Python 3 the futures can be awaited with asyncio.wrap_future.
+    """
+    def __init__(self, url, auth=None, headers=None, verify=True, transport=None,
+                 executor=None, workers=32):
+        self.executor = executor or ThreadPoolExecutor(max_workers=workers)
+        Abiquo.__init__(self, url, auth=auth, headers=headers, verify=verify,
+                transport=transport or Transport(pool_maxsize=workers))
+
+    def close(self):
+        self.executor.shutdown()
+        Abiquo.close(self)
+
+    def _request(self, method, url, params=None, headers=None, data=None):
+        return self.executor.submit(Abiquo._request, self, method, url,
+                params=params, headers=headers, data=data)
+
+    def _child(self, url, headers=None):
+        return AsyncAbiquo(url, auth=self.auth, headers=headers, verify=self.verify,
+                transport=self.transport, executor=self.executor)
+
+    def _dto(self, json, content_type=None, etag=None):
+        return AsyncObjectDto(json, auth=self.auth, content_type=content_type,
+                verify=self.verify, transport=self.transport, etag=etag,
+                executor=self.executor)
+
+class AsyncObjectDto(ObjectDto):
+    """ ObjectDto whose links are followed with AsyncAbiquo clients.
+
+    refresh, put and delete return futures. Iterating the collection fetches the
+    next page in the background while the items of the current one are consumed.
+    """
+    def __init__(self, json, auth=None, content_type=None, verify=True, transport=None,
+                 etag=None, executor=None):
+        self.executor = executor or ThreadPoolExecutor(max_workers=4)
+        ObjectDto.__init__(self, json, auth=auth, content_type=content_type,
+                verify=verify, transport=transport, etag=etag)
+
+    def __iter__(self):
+        try:
+            page = self
+            while page:
+                pending = None
+                if page._has_link('next'):
+                    link = page._extract_link('next')
+                    pending = self.executor.submit(self._get, link['href'],
+                            link.get('type', self.content_type))
+                for json in page.json['collection']:
+                    yield self._item(json)
+                code, page = pending.result() if pending else (None, None)
+                if code != 200:
+                    break
+        except KeyError:
+            raise TypeError('object is not iterable')
+
+    def _item(self, json):
+        return AsyncObjectDto(json, auth=self.auth, verify=self.verify,
+                transport=self.transport, executor=self.executor)
+
+    def _unchanged(self):
+        future = Future()
+        future.set_result((200, self))
+        return future
+
+    def _updated(self, future, sent):
+        future.add_done_callback(
+                lambda f: f.exception() is None and ObjectDto._updated(self, f.result(), sent))
+        return future
+
+    def _client(self, url, accept):
+        return AsyncAbiquo(url, auth=self.auth, headers={'accept' : accept},
+                verify=self.verify, transport=self.transport, executor=self.executor)
@@ -0,0 +1,116 @@
+# Copyright (C) 2008 Abiquo Holdings S.L.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import threading
+import time
+
+from collections import namedtuple
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from urlparse import urlparse
+
+from abiquo.client import Abiquo, ObjectDto
+
+class Operation(object):
+    """ A deferred call to a method of an Abiquo client or an ObjectDto.
+
+    For example Operation(dc.follow('racks'), 'post', data=...) or
+    Operation(vm, 'delete').
+    """
+    def __init__(self, target, method, *args, **kwargs):
+        self.target = target
+        self.method = method
+        self.args = args
+        self.kwargs = kwargs
+
+    def __call__(self):
+        return getattr(self.target, self.method)(*self.args, **self.kwargs)
+
+    def __repr__(self):
+        return 'Operation(%s %s)' % (self.method.upper(), self.url)
+
+    @property
+    def url(self):
+        if isinstance(self.target, Abiquo):
+            return self.target.url
+        if isinstance(self.target, ObjectDto):
+            return self.target.identity()
+        return None
+
+class Result(namedtuple('Result', ['index', 'operation', 'code', 'dto', 'error'])):
+    @property
+    def ok(self):
+        return self.error is None and self.code is not None and 200 <= self.code < 300
+
+class RateLimiter(object):
+    """ Spaces the requests to each host so no more than 'rate' per second are sent. """
+    def __init__(self, rate):
+        self.interval = 1.0 / rate
+        self._next = {}
+        self._lock = threading.Lock()
+
+    def acquire(self, host):
+        with self._lock:
+            now = time.time()
+            at = max(now, self._next.get(host, now))
+            self._next[host] = at + self.interval
+        if at > now:
+            time.sleep(at - now)
+
+class Batch(object):
+    """ Runs operations with bounded concurrency and an optional per-host rate limit.
+
+    run() yields a Result for each operation as soon as it completes. Operations
+    that raise or return an error code do not stop the batch; they are collected
+    in 'failures'.
+    """
+    def __init__(self, workers=8, rate=None):
+        self.workers = workers
+        self.limiter = RateLimiter(rate) if rate else None
+        self.failures = []
+
+    def run(self, operations):
+        executor = ThreadPoolExecutor(max_workers=self.workers)
+        pending = set()
+        try:
+            for index, operation in enumerate(operations):
+                pending.add(executor.submit(self._execute, index, operation))
+                if len(pending) >= self.workers * 2:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for result in self._collect(done):
+                        yield result
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for result in self._collect(done):
+                    yield result
+        finally:
+            for future in pending:
+                future.cancel()
+            executor.shutdown(wait=False)
+
+    def _collect(self, futures):
+        for future in futures:
+            result = future.result()
+            if not result.ok:
+                self.failures.append(result)
+            yield result
+
+    def _execute(self, index, operation):
+        try:
+            if self.limiter:
+                url = getattr(operation, 'url', None)
+                self.limiter.acquire(urlparse(url).netloc if url else None)
+            code, dto = operation()
+            return Result(index, operation, code, dto, None)
+        except Exception as e:
+            return Result(index, operation, None, None, e)
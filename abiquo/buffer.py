@@ -0,0 +1,82 @@
+# Copyright (C) 2008 Abiquo Holdings S.L.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import sys
+import threading
+
+from collections import namedtuple
+from Queue import Empty, Full, Queue
+
+Raised = namedtuple('Raised', ['type', 'value', 'traceback'])
+
+class _Done(object):
+    # Pickled by reference, so it is the same object in other processes
+    def __reduce__(self):
+        return 'DONE'
+
+DONE = _Done()
+
+class Buffer(object):
+    """ A bounded queue between producers and a consumer that may stop reading early.
+
+    Producers put (tag, item) pairs and end with (tag, DONE). An exception raised
+    while producing is put as a Raised item, which keeps its traceback. Once the
+    buffer is closed the producers stop putting items. The queue and the event
+    are made by 'factory', which may be the multiprocessing module to share the
+    buffer with child processes.
+    """
+    def __init__(self, maxsize, factory=None):
+        self.queue = factory.Queue(maxsize) if factory else Queue(maxsize)
+        self.stop = factory.Event() if factory else threading.Event()
+
+    def produce(self, tag, items):
+        """ Puts the items of an iterable, followed by DONE. """
+        try:
+            for item in items:
+                if not self.put((tag, item)):
+                    return
+        except Exception:
+            self.put((tag, Raised(*sys.exc_info())))
+        self.put((tag, DONE))
+
+    def put(self, item):
+        """ Waits for room for the item and returns False if the buffer was closed. """
+        while not self.stop.is_set():
+            try:
+                self.queue.put(item, timeout=0.1)
+                return True
+            except Full:
+                pass
+        return False
+
+    def consume(self, producers):
+        """ Yields the (tag, item) pairs until all the producers are done. """
+        while producers:
+            tag, item = self.queue.get()
+            if item is DONE:
+                producers -= 1
+            else:
+                yield tag, item
+
+    def close(self):
+        self.stop.set()
+        # Unblock the producers waiting for room in the queue
+        while True:
+            try:
+                self.queue.get_nowait()
+            except Empty:
+                break
+
+def reraise(raised):
+    raise raised.type, raised.value, raised.traceback
@@ -0,0 +1,137 @@
+# Copyright (C) 2008 Abiquo Holdings S.L.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import threading
+import time
+
+from collections import OrderedDict
+from urllib import urlencode
+
+from abiquo.singleflight import auth_key
+
+class CacheEntry(object):
+    def __init__(self, code, content, content_type, etag, last_modified):
+        self.code = code
+        self.content = content
+        self.content_type = content_type
+        self.etag = etag
+        self.last_modified = last_modified
+        self.size = len(content)
+        self.stored = time.time()
+
+    def validators(self):
+        headers = {}
+        if self.etag:
+            headers['If-None-Match'] = self.etag
+        if self.last_modified:
+            headers['If-Modified-Since'] = self.last_modified
+        return headers
+
+class ResponseCache(object):
+    """ LRU cache of GET responses revalidated with ETag and Last-Modified.
+
+    Responses are keyed by URL, Accept and Authorization headers, query parameters
+    and credentials. Entries older than 'ttl' seconds or beyond 'max_entries' or
+    'max_bytes' (measured as the size of the response bodies) are evicted. Entries
+    younger than 'fresh_for' seconds are returned without contacting the server;
+    older ones are revalidated with a conditional request and the cached body is
+    reused if the server answers with a 304. The body is decoded again for every
+    caller, so each one gets its own object, and any POST, PUT or DELETE to a URL
+    drops its cached responses.
+    """
+    def __init__(self, max_entries=1000, max_bytes=50 * 1024 * 1024, ttl=3600, fresh_for=0):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.fresh_for = fresh_for
+        self.hits = 0
+        self.misses = 0
+        self.revalidations = 0
+        self.evictions = 0
+        self.bytes_saved = 0
+        self.size = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self):
+        return {'hits': self.hits, 'misses': self.misses, 'revalidations': self.revalidations,
+                'evictions': self.evictions, 'bytes_saved': self.bytes_saved,
+                'entries': len(self._entries), 'size': self.size}
+
+    def key(self, url, headers, params, auth=None):
+        headers = dict((k.lower(), v) for k, v in (headers or {}).items())
+        return (url, headers.get('accept'), urlencode(sorted((params or {}).items()), doseq=True),
+                headers.get('authorization'), auth_key(auth))
+
+    def get(self, key):
+        """ Returns the cached entry for the key, or None if it is missing or expired. """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if time.time() - entry.stored > self.ttl:
+                self._remove(key)
+                return None
+            self._entries[key] = self._entries.pop(key)
+            return entry
+
+    def is_fresh(self, entry):
+        return time.time() - entry.stored < self.fresh_for
+
+    def hit(self, entry):
+        with self._lock:
+            self.hits += 1
+            self.bytes_saved += entry.size
+
+    def revalidated(self, entry):
+        with self._lock:
+            self.revalidations += 1
+            self.bytes_saved += entry.size
+            entry.stored = time.time()
+
+    def miss(self):
+        with self._lock:
+            self.misses += 1
+
+    def store(self, key, response):
+        etag = response.headers.get('etag')
+        last_modified = response.headers.get('last-modified')
+        if not etag and not last_modified and not self.fresh_for:
+            return
+        entry = CacheEntry(response.status_code, response.content,
+                           response.headers.get('content-type'), etag, last_modified)
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = entry
+            self.size += entry.size
+            while self._entries and (len(self._entries) > self.max_entries or self.size > self.max_bytes):
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def invalidate(self, url):
+        with self._lock:
+            for key in [key for key in self._entries if key[0] == url]:
+                self._remove(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+    def _remove(self, key):
+        self.size -= self._entries.pop(key).size
@@ -12,29 +12,40 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-import requests, json
+import hashlib
+import json
+import time
+
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from urllib import urlencode
+from urlparse import parse_qsl, urlparse, urlunparse
+
+from abiquo.codec import DEFAULT_CODEC
+from abiquo.paging import AdaptivePageSize
+from abiquo.stream import CollectionParser
+from abiquo.transport import Transport
 
 class Abiquo(object):
-    def __init__(self, url, auth=None, headers=None, verify=True):
+    def __init__(self, url, auth=None, headers=None, verify=True, transport=None):
         self.url = url
         self.auth = auth
         self.headers = {url : headers}
         self.verify = verify
-        self.session = requests.session()
+        self.transport = transport or Transport()
+        self.session = self.transport.session
 
     def __getattr__(self, key):
         try:
             return self.__dict__[key]
         except:
-            self.__dict__[key] = Abiquo(self._join(self.url, key), auth=self.auth,
-                    verify=self.verify)
+            self.__dict__[key] = self._child(self._join(self.url, key))
             return self.__dict__[key]
 
     def __call__(self, *args):
         if not args:
             return self
-        return Abiquo(self._join(self.url, *[str(i) for i in args]), auth=self.auth,
-                verify=self.verify)
+        return self._child(self._join(self.url, *[str(i) for i in args]))
 
     def get(self, id=None, params=None, headers=None):
         return self._request('get', self._join(self.url, id), 
@@ -52,24 +63,123 @@ class Abiquo(object):
         return self._request('delete', self._join(self.url, id), 
             params=params, headers=headers)        
 
+    def stream(self, id=None, params=None, headers=None, chunk_size=64 * 1024):
+        """ Iterates a collection parsing each item as soon as it is received.
+
+        Unlike get, the response body is never fully loaded in memory. The following
+        pages are requested once the current one has been consumed.
+        """
+        url = self._join(self.url, id)
+        parent_headers = self.headers[url] if url in self.headers else {}
+        headers = self._merge_dicts(parent_headers, headers)
+        instrumentation = self.transport.instrumentation
+        while url:
+            record = instrumentation.start('get', url, headers) if instrumentation else None
+            response = self.transport.request('get',
+                                              url,
+                                              auth=self.auth,
+                                              params=params,
+                                              verify=self.verify,
+                                              headers=headers,
+                                              stream=True,
+                                              coalesce=False)
+            if record is not None:
+                record.mark('wait')
+            try:
+                if response.status_code != 200:
+                    check_response(200, response.status_code, self._parse(response))
+                parser = CollectionParser(response.iter_content(chunk_size),
+                        encoding=response.encoding or 'utf-8')
+                for json in parser:
+                    yield self._dto(json)
+            finally:
+                response.close()
+                if record is not None:
+                    record.mark('download')
+                    instrumentation.finish(record, response.status_code)
+            link = next((l for l in parser.meta.get('links', []) if l['rel'] == 'next'), None)
+            url, params = (link['href'], None) if link else (None, None)
+            if link and 'type' in link:
+                headers = dict((k, v) for k, v in headers.items() if k.lower() != 'accept')
+                headers['accept'] = link['type']
+
     def _request(self, method, url, params=None, headers=None, data=None):
         parent_headers = self.headers[url] if url in self.headers else {}
-        response = self.session.request(method, 
-                                        url, 
-                                        auth=self.auth, 
-                                        params=params, 
-                                        data=data,
-                                        verify=self.verify,
-                                        headers=self._merge_dicts(parent_headers, headers))
-        response_dto = None
-        if len(response.text) > 0:
+        headers = self._merge_dicts(parent_headers, headers)
+        instrumentation = self.transport.instrumentation
+        if instrumentation is None:
+            return self._send(method, url, params, headers, data)
+        record = instrumentation.start(method, url, headers)
+        try:
+            code, response_dto = self._send(method, url, params, headers, data, record)
+        except Exception as e:
+            instrumentation.finish(record, error=e)
+            raise
+        instrumentation.finish(record, code)
+        return code, response_dto
+
+    def _send(self, method, url, params, headers, data, record=None):
+        cache = self.transport.cache
+        entry = None
+        if cache is not None:
+            if method != 'get':
+                cache.invalidate(url)
+                cache = None
+            else:
+                key = cache.key(url, headers, params, self.auth)
+                entry = cache.get(key)
+                if entry and cache.is_fresh(entry):
+                    cache.hit(entry)
+                    return entry.code, self._decode(entry.content, entry.content_type, entry.etag)
+                if entry:
+                    headers = self._merge_dicts(headers, entry.validators())
+        response = self.transport.request(method, 
+                                          url, 
+                                          auth=self.auth, 
+                                          params=params, 
+                                          data=data,
+                                          verify=self.verify,
+                                          headers=headers,
+                                          stream=record is not None)
+        if record is not None:
+            record.mark('wait')
+            response.content
+            record.mark('download')
+        if entry and response.status_code == 304:
+            cache.revalidated(entry)
+            return entry.code, self._decode(entry.content, entry.content_type, entry.etag)
+        response_dto = self._parse(response, record)
+        if cache is not None:
+            cache.miss()
+            if response.status_code == 200:
+                cache.store(key, response)
+        return response.status_code, response_dto
+
+    def close(self):
+        self.transport.close()
+
+    def _parse(self, response, record=None):
+        return self._decode(response.content, response.headers.get('content-type', None),
+                response.headers.get('etag', None), record)
+
+    def _decode(self, content, content_type, etag, record=None):
+        if len(content) > 0:
             try:
-                response_dto = ObjectDto(response.json(), auth=self.auth, 
-                    content_type=response.headers.get('content-type', None),
-                    verify=self.verify)
+                data = self.transport.codec.loads(content)
             except ValueError:
-                pass
-        return response.status_code, response_dto
+                return None
+            if record is not None:
+                record.mark('decode')
+            return self._dto(data, content_type=content_type, etag=etag)
+        return None
+
+    def _child(self, url, headers=None):
+        return Abiquo(url, auth=self.auth, headers=headers, verify=self.verify,
+                transport=self.transport)
+
+    def _dto(self, json, content_type=None, etag=None):
+        return ObjectDto(json, auth=self.auth, content_type=content_type,
+                verify=self.verify, transport=self.transport, etag=etag)
 
     def _merge_dicts(self, x, y):
         new_dict = {}
@@ -82,11 +192,20 @@ class Abiquo(object):
     def _join(self, *args):
         return "/".join(filter(None, args))
 
+def digest(json_object):
+    """ Returns a short hash of the content of an object, independent of the key order. """
+    return hashlib.sha1(json.dumps(json_object, sort_keys=True, separators=(',', ':'))).digest()[:8]
+
 class ObjectDto(object):
-    def __init__(self, json, auth=None, content_type=None, verify=True):
+    def __init__(self, json, auth=None, content_type=None, verify=True, transport=None,
+                 etag=None):
         self.auth = auth
         self.content_type = content_type
         self.verify = verify
+        self.transport = transport
+        self.etag = etag
+        # Digests of the attributes as retrieved, taken before they can be modified
+        self._original = None
 
         # JSON needs to be at the end because of the implementation in __setattr__
         self.json = json
@@ -102,13 +221,20 @@ class ObjectDto(object):
             self.__dict__[key] = value
         else:
             if 'json' in self.__dict__:
+                self._track(key)
                 self.__dict__['json'][key] = value
+                if key == 'links':
+                    self.invalidate_links()
             else:
                 self.__dict__[key] = value
             
     def _find_or_raise(self, key):
         if key in self.json:
-            return self.json[key]
+            value = self.json[key]
+            if isinstance(value, (dict, list)):
+                # It may be modified in place by the caller
+                self._track(key)
+            return value
         else:
             try:
                 return self.follow(key)
@@ -117,22 +243,76 @@ class ObjectDto(object):
 
     def refresh(self, params=None, headers=None):
         return self.follow('edit' if self._has_link('edit') else 'self').get(params=params, headers=headers)
-        
-    def put(self, params=None):
+
+    def identity(self):
+        """ Returns the href of the edit or self link of the object, or None if it has none. """
+        if 'links' not in self.json:
+            return None
+        link = self._extract_link('edit') or self._extract_link('self')
+        return link['href'] if link else None
+
+    def put(self, params=None, force=False, if_match=False):
+        """ Updates the object, unless it has not been modified since it was retrieved.
+
+        When nothing has changed no request is sent and (200, self) is returned;
+        use force to send it anyway. Changes are tracked in the attributes set or
+        read through the object, and, once it has been updated, in all of them.
+        An object that is not tracked yet, for example one only modified through
+        its json dict, is always sent. With if_match the update is conditional to
+        the ETag the object was retrieved with, and fails with a 412 if it has
+        changed in the server.
+        """
         if not self._has_link('edit'):
             raise TypeError('object is not editable')
+        if not force and self._original is not None and not self.changed_fields():
+            return self._unchanged()
         link_type = self._extract_link('edit')['type']
-        return self.follow('edit').put(params=params, headers={'Content-Type': link_type}, data=json.dumps(self.json))
+        headers = {'Content-Type': link_type}
+        if if_match and self.etag:
+            headers['If-Match'] = self.etag
+        codec = self.transport.codec if self.transport else DEFAULT_CODEC
+        data = codec.dumps(self.json)
+        sent = dict((key, digest(value)) for key, value in self.json.items())
+        return self._updated(self.follow('edit').put(params=params, headers=headers, data=data), sent)
+
+    def changed_fields(self):
+        """ Returns the names of the attributes modified since the object was retrieved. """
+        if self._original is None:
+            return set()
+        return set(key for key, original in self._original.items() if self._digest(key) != original)
+
+    def changes(self):
+        return dict((key, self.json.get(key)) for key in self.changed_fields())
+
+    def _track(self, key):
+        if self._original is None:
+            self.__dict__['_original'] = {}
+        if key not in self._original:
+            self._original[key] = self._digest(key)
+
+    def _digest(self, key):
+        # Missing attributes have no digest
+        return digest(self.json[key]) if key in self.json else None
+
+    def _unchanged(self):
+        return 200, self
+
+    def _updated(self, result, sent):
+        code, dto = result
+        if code is not None and 200 <= code < 300:
+            self.__dict__['_original'] = sent
+            if dto is not None and dto.etag:
+                self.__dict__['etag'] = dto.etag
+        return result
 
     def delete(self, params=None, headers=None):
         return self.follow('edit' if self._has_link('edit') else 'self').delete(params=params, headers=headers)
 
-    def follow(self, rel):
-        link = self._extract_link(rel)
+    def follow(self, rel, title=None, type=None):
+        link = self._extract_link(rel, title=title, type=type)
         if not link:
             raise KeyError("link with rel %s not found" % rel)
-        return Abiquo(url=link['href'], auth=self.auth, headers={'accept' : link['type']},
-                verify=self.verify)
+        return self._client(link['href'], link['type'])
 
     def __len__(self):
         try:
@@ -142,35 +322,395 @@ class ObjectDto(object):
         except KeyError:
             raise TypeError('object has no len()')
 
+    def count(self):
+        """ Returns the size of the collection.
+
+        Unlike len(), if the page does not include the total size and there are more
+        pages, it is requested with a single item page, as the API has no count-only
+        requests.
+        """
+        if 'totalSize' in self.json:
+            return self.json['totalSize']
+        link = self._page_link()
+        if link is None or not self._has_link('next'):
+            return self._offset() + len(self.json['collection'])
+        page = self._fetch_page(link['href'], 0, 1, link.get('type', self.content_type))
+        if 'totalSize' not in page.json:
+            raise TypeError('collection size is unknown')
+        return page.json['totalSize']
+
     def __iter__(self):
+        for json in self._collection():
+            yield self._item(json)
+
+    def __getitem__(self, index):
+        """ Returns an item or a list with a slice of the collection.
+
+        Indexes refer to the whole collection, not to this page, and only the pages
+        with the requested items are fetched. Negative indexes and open slices need
+        the size of the collection, see count().
+        """
+        if 'collection' not in self.json:
+            raise TypeError('object is not subscriptable')
+        if isinstance(index, slice):
+            start, stop, step = index.indices(self._bound(index))
+            if step < 0:
+                return self[stop + 1:start + 1][::step] if start > stop else []
+            return [self._item(json) for json in self._range(start, stop)][::step]
+        if index < 0:
+            index += self.count()
+        items = list(self._range(index, index + 1)) if index >= 0 else []
+        if not items:
+            raise IndexError('collection index out of range')
+        return self._item(items[0])
+
+    def _bound(self, index):
+        # The size is only needed for negative indexes and open slices
+        if index.stop is None or index.stop < 0 or (index.start or 0) < 0 or \
+                (index.step or 1) < 0:
+            return self.count()
+        return max(index.stop, index.start or 0)
+
+    def _range(self, start, stop):
+        # Yields the json items from start to stop, reusing the ones of this page
+        collection = self.json['collection']
+        first = self._offset()
+        last = first + len(collection)
+        link = self._page_link()
+        accept = link.get('type', self.content_type) if link else None
+        limit = self._limit()
+        offset = start
+        while offset < stop:
+            if first <= offset < last:
+                end = min(stop, last)
+                for json in collection[offset - first:end - first]:
+                    yield json
+            elif link is None:
+                return
+            else:
+                end = min(stop, offset + limit, first if offset < first else stop)
+                page = self._fetch_page(link['href'], offset, end - offset, accept)
+                if not page.json['collection']:
+                    return
+                for json in page.json['collection']:
+                    yield json
+                end = offset + len(page.json['collection'])
+            offset = end
+
+    def _page_link(self):
+        if 'links' not in self.json:
+            return None
+        for rel in ('next', 'prev', 'first', 'last', 'self'):
+            link = self._extract_link(rel)
+            if link:
+                return link
+        return None
+
+    def _offset(self):
+        # The position of the first item of this page in the whole collection
+        for rel, shift in (('next', -1), ('prev', 1)):
+            link = self._extract_link(rel) if 'links' in self.json else None
+            if link:
+                query = dict(parse_qsl(urlparse(link['href']).query))
+                if 'startwith' in query:
+                    if shift < 0:
+                        return max(0, int(query['startwith']) - len(self.json['collection']))
+                    return int(query['startwith']) + int(query.get('limit', len(self.json['collection'])))
+        return 0
+
+    def _limit(self):
+        link = self._extract_link('next') if 'links' in self.json else None
+        query = dict(parse_qsl(urlparse(link['href']).query)) if link else {}
+        return int(query.get('limit', len(self.json['collection']) or 25))
+
+    def compact(self):
+        """ Iterates the collection yielding read-only CompactDto items.
+
+        All the items share a single DtoContext and keep their data serialized,
+        so large result sets can be held in memory at a fraction of the cost.
+        """
+        context = DtoContext(self.auth, self.verify, self.transport)
+        for json in self._collection():
+            yield CompactDto(json, context)
+
+    def _collection(self):
         try:
             for json in self.json['collection']:
-                yield ObjectDto(json, auth=self.auth, verify=self.verify)
+                yield json
 
             current_page = self
             while current_page._has_link('next'):
                 link = current_page._extract_link('next')
-                client = Abiquo(url=link['href'], 
-                                auth=self.auth, 
-                                headers={'Accept' : link.get('type', self.content_type)},
-                                verify=self.verify)
-                sc, current_page = client.get()
+                sc, current_page = self._get(link['href'], link.get('type', self.content_type))
                 if sc == 200 and current_page:
                     for json in current_page.json['collection']:
-                        yield ObjectDto(json, auth=self.auth, verify=self.verify)
+                        yield json
+        except KeyError:
+            raise TypeError('object is not iterable')
+
+    def prefetch(self, workers=4, window=None):
+        """ Iterates the collection fetching up to 'workers' pages concurrently.
+
+        Items are yielded in order and at most 'window' pages (by default as many as
+        workers) are kept in memory ahead of the one being consumed. If the total size
+        of the collection is not known it falls back to sequential iteration.
+        """
+        link = self._extract_link('next') if 'links' in self.json else None
+        if not link or 'totalSize' not in self.json:
+            for item in self:
+                yield item
+            return
+
+        query = dict(parse_qsl(urlparse(link['href']).query))
+        limit = int(query.get('limit', len(self.json['collection'])))
+        start = int(query.get('startwith', len(self.json['collection'])))
+        offsets = iter(xrange(start, self.json['totalSize'], limit))
+        accept = link.get('type', self.content_type)
+
+        for json in self.json['collection']:
+            yield self._item(json)
+
+        executor = ThreadPoolExecutor(max_workers=workers)
+        pending = deque()
+        try:
+            for offset in offsets:
+                pending.append(executor.submit(self._fetch_page, link['href'], offset, limit, accept))
+                if len(pending) >= (window or workers):
+                    break
+            while pending:
+                page = pending.popleft().result()
+                offset = next(offsets, None)
+                if offset is not None:
+                    pending.append(executor.submit(self._fetch_page, link['href'], offset, limit, accept))
+                for json in page.json['collection']:
+                    yield self._item(json)
+        finally:
+            for future in pending:
+                future.cancel()
+            executor.shutdown(wait=False)
+
+    def expand(self, rels, workers=8, window=None, shared=1000):
+        """ Iterates the collection yielding (item, linked, ...) tuples in order.
+
+        The links with the given rels of each item are followed concurrently by up
+        to 'workers' threads while the following items, and pages, are read. The
+        linked objects are None if the item has no such link or it can not be
+        fetched. Items linking to the same href share a single request, as long as
+        it is one of the last 'shared' hrefs requested.
+        """
+        rels = [rels] if isinstance(rels, basestring) else list(rels)
+        window = window or workers * 4
+        executor = ThreadPoolExecutor(max_workers=workers)
+        resolved = OrderedDict()
+        pending = deque()
+        try:
+            for item in self:
+                pending.append((item, [self._follow_async(executor, resolved, shared, item, rel)
+                                       for rel in rels]))
+                if len(pending) >= window:
+                    yield self._expanded(*pending.popleft())
+            while pending:
+                yield self._expanded(*pending.popleft())
+        finally:
+            for item, futures in pending:
+                for future in futures:
+                    if future is not None:
+                        future.cancel()
+            executor.shutdown(wait=False)
+
+    def _follow_async(self, executor, resolved, shared, item, rel):
+        link = item._extract_link(rel) if 'links' in item.json else None
+        if not link:
+            return None
+        key = (link['href'], link.get('type'))
+        future = resolved.pop(key, None)
+        if future is None:
+            future = executor.submit(item._get, link['href'], link.get('type'))
+            if len(resolved) >= shared:
+                resolved.popitem(last=False)
+        resolved[key] = future
+        return future
+
+    def _expanded(self, item, futures):
+        linked = []
+        for future in futures:
+            try:
+                code, dto = future.result() if future is not None else (None, None)
+            except Exception:
+                # Like a missing link, a request that fails leaves the object as None
+                code, dto = None, None
+            linked.append(dto if code == 200 else None)
+        return (item,) + tuple(linked)
+
+    def adaptive(self, latency=1.0, budget=4 * 1024 * 1024, max_limit=1000):
+        """ Iterates the collection adapting the size of the following pages.
+
+        Pages grow while they are fetched faster than 'latency' seconds, to save
+        round trips, as long as they fit in 'budget' bytes and 'max_limit' items.
+        """
+        try:
+            collection = self.json['collection']
         except KeyError:
             raise TypeError('object is not iterable')
+        for json in collection:
+            yield self._item(json)
+        link = self._extract_link('next') if 'links' in self.json else None
+        if not link:
+            return
+
+        query = dict(parse_qsl(urlparse(link['href']).query))
+        offset = int(query.get('startwith', len(collection)))
+        sizer = AdaptivePageSize(int(query.get('limit', len(collection) or 1)),
+                latency=latency, budget=budget, max_limit=max_limit)
+        codec = self.transport.codec if self.transport else DEFAULT_CODEC
+        sizer.sized(len(collection), len(codec.dumps(collection)))
+        accept = link.get('type', self.content_type)
+
+        while True:
+            start = time.time()
+            page = self._fetch_page(link['href'], offset, sizer.limit, accept)
+            collection = page.json['collection']
+            if sizer.item_size is None:
+                sizer.sized(len(collection), len(codec.dumps(collection)))
+            sizer.observe(len(collection), time.time() - start)
+            for json in collection:
+                yield self._item(json)
+            offset += len(collection)
+            if not collection or not page._has_link('next'):
+                return
+
+    def _fetch_page(self, href, offset, limit, accept):
+        url = urlparse(href)
+        query = dict(parse_qsl(url.query))
+        query.update({'startwith': offset, 'limit': limit})
+        code, page = self._get(urlunparse(url._replace(query=urlencode(query))), accept)
+        check_response(200, code, page)
+        return page
+
+    def _item(self, json):
+        return ObjectDto(json, auth=self.auth, verify=self.verify, transport=self.transport)
+
+    def _client(self, url, accept):
+        return Abiquo(url=url, auth=self.auth, headers={'accept' : accept},
+                verify=self.verify, transport=self.transport)
+
+    def _get(self, url, accept):
+        return ObjectDto._client(self, url, accept).get()
 
     def __dir__(self):
         return dir(type(self)) + self.json.keys()
 
-    def _extract_link(self, rel):
-        return next((link for link in self.json['links'] if link['rel'] == rel), None)
+    def find_links(self, rel, title=None, type=None):
+        """ Returns all the links with the given rel, optionally filtered by title and type. """
+        return [link for link in self._links_by_rel().get(rel, ())
+                if (title is None or link.get('title') == title)
+                and (type is None or link.get('type') == type)]
+
+    def invalidate_links(self):
+        """ Drops the index of the links by rel. Call it after modifying the list of
+        links in place; assigning a new list is detected. """
+        self.__dict__.pop('_links_index', None)
+
+    def _links_by_rel(self):
+        links = self.json['links']
+        index = self.__dict__.get('_links_index')
+        if index is None or index[0] is not links:
+            by_rel = {}
+            for link in links:
+                by_rel.setdefault(link['rel'], []).append(link)
+            index = (links, by_rel)
+            self.__dict__['_links_index'] = index
+        return index[1]
+
+    def _extract_link(self, rel, title=None, type=None):
+        if title is None and type is None:
+            links = self._links_by_rel().get(rel)
+        else:
+            links = self.find_links(rel, title=title, type=type)
+        return links[0] if links else None
 
     def _has_link(self, rel):
         return True if self._extract_link(rel) else False
 
 
+class DtoContext(object):
+    __slots__ = ('auth', 'verify', 'transport', 'codec')
+
+    def __init__(self, auth=None, verify=True, transport=None):
+        self.auth = auth
+        self.verify = verify
+        self.transport = transport
+        self.codec = transport.codec if transport else DEFAULT_CODEC
+
+class CompactDto(object):
+    """ Memory-lean, read-only view of an Abiquo object.
+
+    The object is kept as compact JSON text and decoded on each attribute access.
+    Nested objects are returned as CompactDto views built on demand. Use to_dto to
+    get a full ObjectDto that can be modified and updated.
+    """
+    __slots__ = ('_context', '_raw', '_json')
+
+    def __init__(self, data, context):
+        self._context = context
+        if isinstance(data, basestring):
+            self._raw, self._json = data, None
+        else:
+            self._raw, self._json = context.codec.dumps(data), None
+
+    @property
+    def json(self):
+        return self._json if self._json is not None else self._context.codec.loads(self._raw)
+
+    def __getattr__(self, key):
+        if key.startswith('__') or key in CompactDto.__slots__:
+            raise AttributeError(key)
+        data = self.json
+        if key in data:
+            value = data[key]
+            return CompactDto._view(value, self._context) if isinstance(value, dict) else value
+        try:
+            return self.follow(key)
+        except:
+            raise KeyError
+
+    def __setattr__(self, key, value):
+        if key not in CompactDto.__slots__:
+            raise AttributeError('CompactDto is read-only, use to_dto() to modify it')
+        object.__setattr__(self, key, value)
+
+    def __dir__(self):
+        return dir(type(self)) + self.json.keys()
+
+    def __getstate__(self):
+        return (self._context, self._raw, self._json)
+
+    def __setstate__(self, state):
+        for key, value in zip(CompactDto.__slots__, state):
+            object.__setattr__(self, key, value)
+
+    def to_dto(self):
+        return ObjectDto(self.json, auth=self._context.auth, verify=self._context.verify,
+                transport=self._context.transport)
+
+    def follow(self, rel, title=None, type=None):
+        return self.to_dto().follow(rel, title=title, type=type)
+
+    def refresh(self, params=None, headers=None):
+        return self.to_dto().refresh(params=params, headers=headers)
+
+    def delete(self, params=None, headers=None):
+        return self.to_dto().delete(params=params, headers=headers)
+
+    @staticmethod
+    def _view(data, context):
+        view = CompactDto.__new__(CompactDto)
+        object.__setattr__(view, '_context', context)
+        object.__setattr__(view, '_raw', None)
+        object.__setattr__(view, '_json', data)
+        return view
+
+
 def check_response(expected_code, code, errors):
     if code != expected_code:
         try:
@@ -0,0 +1,111 @@
+# Copyright (C) 2008 Abiquo Holdings S.L.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from collections import deque, namedtuple
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from abiquo.client import digest
+
+Failure = namedtuple('Failure', ['path', 'href', 'code', 'error'])
+
+class Crawler(object):
+    """ Breadth-first traversal of the link graph of the API.
+
+    crawl() follows the rels of the path from the root object: the first rel from
+    the root, the second one from each object found, and so on. Collections are
+    expanded into their items, and each page is fetched as a separate request.
+    Every href is only fetched once, and every object only yielded once, even if
+    many objects link to it. Up to 'workers' requests are in flight at the same
+    time. Pending work is kept as (depth, href, type) tuples and visited hrefs as
+    short sha1 digests. Once 'max_pending' links are waiting, the responses that
+    would add more, by following the path or a next page, are held until the
+    queue drains, so memory stays bounded for graphs with hundreds of thousands
+    of nodes.
+    """
+    def __init__(self, workers=8, max_pending=10000):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.failures = []
+
+    def crawl(self, root, path):
+        """ Yields (path, dto) tuples, where path is the tuple of rels that led to the object. """
+        path = tuple(path)
+        visited = set()
+        queue = deque()
+        held = deque()
+        self._expand(root, 0, path, visited, queue)
+
+        executor = ThreadPoolExecutor(max_workers=self.workers)
+        pending = {}
+        try:
+            while queue or pending or held:
+                while held and len(queue) < self.max_pending:
+                    for item in self._collect(path, visited, queue, *held.popleft()):
+                        yield item
+                while queue and len(pending) < self.workers:
+                    depth, href, type = queue.popleft()
+                    pending[executor.submit(root._get, href, type)] = (depth, href, type)
+                if not pending:
+                    continue
+                done, _ = wait(pending.keys(), return_when=FIRST_COMPLETED)
+                for future in done:
+                    depth, href, type = pending.pop(future)
+                    if depth < len(path) and len(queue) >= self.max_pending:
+                        # Backpressure: its items would add more links to the queue
+                        held.append((future, depth, href, type))
+                        continue
+                    for item in self._collect(path, visited, queue, future, depth, href, type):
+                        yield item
+        finally:
+            for future in pending:
+                future.cancel()
+            executor.shutdown(wait=False)
+
+    def _collect(self, path, visited, queue, future, depth, href, type):
+        try:
+            code, dto = future.result()
+        except Exception as e:
+            self.failures.append(Failure(path[:depth], href, None, e))
+            return
+        if code != 200 or dto is None:
+            self.failures.append(Failure(path[:depth], href, code, None))
+            return
+        if 'collection' not in dto.json:
+            items = [dto]
+        else:
+            items = (dto._item(json) for json in dto.json['collection'])
+            following = dto._extract_link('next') if 'links' in dto.json else None
+            if following:
+                # Following pages are fetched at the same depth as the first one
+                self._enqueue(depth, following['href'], following.get('type', type), visited, queue)
+        for item in items:
+            identity = item.identity()
+            if identity is not None and identity != href:
+                key = digest(identity)
+                if key in visited:
+                    continue
+                visited.add(key)
+            self._expand(item, depth, path, visited, queue)
+            yield path[:depth], item
+
+    def _expand(self, dto, depth, path, visited, queue):
+        if depth < len(path) and 'links' in dto.json:
+            for link in dto.find_links(path[depth]):
+                self._enqueue(depth + 1, link['href'], link.get('type'), visited, queue)
+
+    def _enqueue(self, depth, href, type, visited, queue):
+        key = digest(href)
+        if key not in visited:
+            visited.add(key)
+            queue.append((depth, href, type))
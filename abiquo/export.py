@@ -0,0 +1,120 @@
+# Copyright (C) 2008 Abiquo Holdings S.L.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import csv
+import json
+import threading
+
+from abiquo.buffer import Buffer, Raised, reraise
+
+def select(json_object, field):
+    """ Returns the value of a dotted field, such as 'location.city', or None if missing. """
+    value = json_object
+    for key in field.split('.'):
+        if not isinstance(value, dict) or key not in value:
+            return None
+        value = value[key]
+    return value
+
+class Exporter(object):
+    """ Writes the items of a collection to a file as they are fetched.
+
+    The collection is read in a background thread while the rows are written in
+    batches of 'batch' items, and at most two batches are kept waiting, so the
+    memory used does not depend on the size of the collection. 'fields' are the
+    dotted names of the attributes to export; by default NDJSON exports whole
+    items and CSV the attributes of the first one.
+    """
+    def __init__(self, fields=None, batch=500):
+        self.fields = list(fields) if fields else None
+        self.batch = batch
+
+    def ndjson(self, items, out):
+        """ Writes one JSON document per line and returns the number of items written. """
+        if self.fields:
+            document = lambda json_object: dict((f, select(json_object, f)) for f in self.fields)
+        else:
+            document = lambda json_object: json_object
+        encode = json.JSONEncoder(separators=(',', ':')).encode
+        return self._export(items, lambda json_object: encode(document(json_object)) + '\n',
+                            out.writelines)
+
+    def csv(self, items, out):
+        """ Writes a header and a row per item and returns the number of items written.
+        Nested values are written as JSON. """
+        writer = csv.writer(out)
+        fields = self.fields
+
+        def row(json_object):
+            return [self._cell(select(json_object, field)) for field in fields]
+
+        def write(rows):
+            writer.writerows(rows)
+
+        rows = self._rows(items)
+        first = next(rows, None)
+        if first is None:
+            if fields:
+                writer.writerow(fields)
+            return 0
+        if not fields:
+            fields = sorted(k for k in first if k != 'links')
+        writer.writerow(fields)
+        return self._export(self._chain(first, rows), row, write)
+
+    def _export(self, items, convert, write):
+        count = 0
+        batch = []
+        for json_object in self._fetched(items):
+            batch.append(convert(json_object))
+            if len(batch) >= self.batch:
+                write(batch)
+                count += len(batch)
+                batch = []
+        if batch:
+            write(batch)
+            count += len(batch)
+        return count
+
+    def _fetched(self, items):
+        # Reads the items in a background thread, so fetching overlaps with writing
+        queue = Buffer(2 * self.batch)
+        thread = threading.Thread(target=queue.produce, args=(None, self._rows(items)))
+        thread.daemon = True
+        thread.start()
+        try:
+            for tag, item in queue.consume(1):
+                if isinstance(item, Raised):
+                    reraise(item)
+                yield item
+        finally:
+            queue.close()
+
+    def _rows(self, items):
+        for item in items:
+            yield item.json if hasattr(item, 'json') else item
+
+    def _chain(self, first, rest):
+        yield first
+        for item in rest:
+            yield item
+
+    def _cell(self, value):
+        if value is None:
+            return ''
+        if isinstance(value, (dict, list)):
+            return json.dumps(value, separators=(',', ':'))
+        if isinstance(value, unicode):
+            return value.encode('utf-8')
+        return value
@@ -0,0 +1,92 @@
+# Copyright (C) 2008 Abiquo Holdings S.L.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from abiquo.buffer import Buffer, Raised
+from abiquo.client import Abiquo, check_response
+from abiquo.transport import Transport
+
+Result = namedtuple('Result', ['endpoint', 'value', 'error'])
+Tagged = namedtuple('Tagged', ['endpoint', 'dto'])
+Failure = namedtuple('Failure', ['endpoint', 'error'])
+
+class Endpoint(object):
+    """ An Abiquo installation, with its own connection pool, credentials and timeout. """
+    def __init__(self, name, url, auth=None, timeout=None, verify=True, transport=None):
+        self.name = name
+        self.client = Abiquo(url, auth=auth, verify=verify,
+                transport=transport or Transport(timeout=timeout))
+
+    def __repr__(self):
+        return 'Endpoint(%s %s)' % (self.name, self.client.url)
+
+class FanOut(object):
+    """ Runs the same request against many Abiquo installations at once.
+
+    Each endpoint is queried in its own thread, so a slow or failing one does
+    not block the others. Results are yielded as they arrive, tagged with the
+    name of the endpoint they come from, and errors are collected in 'failures'
+    instead of stopping the rest of the endpoints.
+    """
+    def __init__(self, endpoints):
+        self.endpoints = list(endpoints)
+        self.failures = []
+        self.executor = ThreadPoolExecutor(max_workers=max(1, len(self.endpoints)))
+
+    def run(self, function):
+        """ Calls function(client) for each endpoint and yields a Result as each one ends. """
+        futures = dict((self.executor.submit(function, endpoint.client), endpoint)
+                       for endpoint in self.endpoints)
+        for future in as_completed(futures):
+            endpoint = futures[future]
+            try:
+                yield Result(endpoint.name, future.result(), None)
+            except Exception as e:
+                self.failures.append(Failure(endpoint.name, e))
+                yield Result(endpoint.name, None, e)
+
+    def get(self, path, params=None, headers=None):
+        """ Yields a Result with the (code, dto) tuple of each endpoint. """
+        return self.run(lambda client: self._resolve(client, path).get(params=params, headers=headers))
+
+    def iterate(self, path, params=None, headers=None, buffer=1000):
+        """ Iterates a collection in all the endpoints, yielding a Tagged item as soon
+        as it is received from any of them. At most 'buffer' items are kept waiting. """
+        items = Buffer(buffer)
+        for endpoint in self.endpoints:
+            self.executor.submit(items.produce, endpoint, self._items(endpoint, path, params, headers))
+        try:
+            for endpoint, item in items.consume(len(self.endpoints)):
+                if isinstance(item, Raised):
+                    self.failures.append(Failure(endpoint.name, item.value))
+                else:
+                    yield Tagged(endpoint.name, item)
+        finally:
+            items.close()
+
+    def close(self):
+        self.executor.shutdown(wait=False)
+        for endpoint in self.endpoints:
+            endpoint.client.close()
+
+    def _items(self, endpoint, path, params, headers):
+        code, collection = self._resolve(endpoint.client, path).get(params=params, headers=headers)
+        check_response(200, code, collection)
+        for item in collection:
+            yield item
+
+    def _resolve(self, client, path):
+        return client(*[segment for segment in path.split('/') if segment])
@@ -0,0 +1,122 @@
+# Copyright (C) 2008 Abiquo Holdings S.L.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import logging
+import re
+import threading
+import time
+
+from urlparse import urlparse
+
+ID_SEGMENT = re.compile(r'/(\d+|[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12})(?=/|$)')
+
+def url_template(url):
+    """ Returns the path of the URL with the identifiers collapsed, e.g. /api/admin/datacenters/{id}/racks """
+    return ID_SEGMENT.sub('/{id}', urlparse(url).path)
+
+class RequestRecord(object):
+    """ Timings of a request, in seconds, broken down by phase.
+
+    The phases are 'wait' (connecting and waiting for the response headers),
+    'download' (reading the body), 'decode' (parsing the JSON) and 'dto'
+    (building the ObjectDto). Before hooks can modify the request headers.
+    """
+    def __init__(self, method, url, headers):
+        self.method = method
+        self.url = url
+        self.template = url_template(url)
+        self.headers = headers
+        self.code = None
+        self.error = None
+        self.timings = {}
+        self.started = time.time()
+        self._last = self.started
+
+    def mark(self, phase):
+        now = time.time()
+        self.timings[phase] = self.timings.get(phase, 0) + now - self._last
+        self._last = now
+
+    @property
+    def total(self):
+        return self._last - self.started
+
+class Instrumentation(object):
+    """ Calls the registered hooks around each request and feeds a MetricsRegistry.
+
+    Attach it to the Transport of a client to enable it. Before hooks receive the
+    RequestRecord before the request is sent, and after hooks receive it once the
+    response has been processed.
+    """
+    def __init__(self, registry=None, before=None, after=None):
+        self.registry = registry
+        self.before = list(before or [])
+        self.after = list(after or [])
+
+    def start(self, method, url, headers):
+        record = RequestRecord(method, url, headers)
+        for hook in self.before:
+            hook(record)
+        return record
+
+    def finish(self, record, code=None, error=None):
+        record.mark('dto' if code is not None else 'error')
+        record.code = code
+        record.error = error
+        if self.registry is not None:
+            self.registry.observe(record)
+        for hook in self.after:
+            hook(record)
+
+class MetricsRegistry(object):
+    """ In-process counters and phase timings per method and URL template. """
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def observe(self, record):
+        key = (record.method.upper(), record.template)
+        with self._lock:
+            metric = self._metrics.get(key)
+            if metric is None:
+                metric = self._metrics[key] = {'count': 0, 'errors': 0, 'total': 0.0,
+                                               'max': 0.0, 'phases': {}}
+            metric['count'] += 1
+            if record.error is not None or record.code >= 400:
+                metric['errors'] += 1
+            metric['total'] += record.total
+            metric['max'] = max(metric['max'], record.total)
+            for phase, elapsed in record.timings.items():
+                metric['phases'][phase] = metric['phases'].get(phase, 0) + elapsed
+
+    def snapshot(self):
+        with self._lock:
+            return dict((key, dict(metric, phases=dict(metric['phases'])))
+                        for key, metric in self._metrics.items())
+
+    def reset(self):
+        with self._lock:
+            self._metrics.clear()
+
+def logging_hook(logger=None, level=logging.DEBUG):
+    """ Returns an after hook that logs every request with its timings. """
+    logger = logger or logging.getLogger('abiquo')
+    def log(record):
+        if logger.isEnabledFor(level):
+            phases = ' '.join('%s=%.1fms' % (phase, elapsed * 1000)
+                              for phase, elapsed in sorted(record.timings.items()))
+            logger.log(level, '%s %s -> %s in %.1fms (%s)', record.method.upper(), record.url,
+                       record.code if record.error is None else record.error,
+                       record.total * 1000, phases)
+    return log
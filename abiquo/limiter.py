@@ -0,0 +1,111 @@
+# Copyright (C) 2008 Abiquo Holdings S.L.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import threading
+
+OVERLOAD_STATUSES = frozenset([429, 502, 503, 504])
+
+class ConcurrencyLimiter(object):
+    """ Limits the requests in flight to each host, adapting the limit to the latency.
+
+    The limit of a host grows additively, by about one request per round trip,
+    while the requests take less than 'tolerance' times the lowest latency seen,
+    and it is multiplied by 'backoff' when they take longer, fail or get an
+    overload status such as 429 or 503, at most once for the requests that were
+    in flight at the same time. Requests over the limit wait for a slot.
+    The baseline latency slowly follows the observed one, so the limit recovers
+    if the API gets permanently slower.
+    """
+    def __init__(self, initial=4, min_limit=1, max_limit=64, tolerance=2.0, backoff=0.9,
+                 statuses=OVERLOAD_STATUSES):
+        self.initial = initial
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.tolerance = tolerance
+        self.backoff = backoff
+        self.statuses = frozenset(statuses)
+        self._hosts = {}
+        self._lock = threading.Lock()
+
+    def acquire(self, host):
+        """ Waits until a request to the host can be sent and returns the token to
+        release it with. """
+        state = self._host(host)
+        with state.cond:
+            state.waiting += 1
+            while state.in_flight >= int(state.limit):
+                state.cond.wait()
+            state.waiting -= 1
+            state.in_flight += 1
+            state.sequence += 1
+            return state.sequence
+
+    def release(self, host, token, latency, status=None, error=False):
+        """ Records the outcome of a request and frees its slot. """
+        state = self._host(host)
+        with state.cond:
+            busy = state.in_flight >= int(state.limit) / 2.0
+            state.in_flight -= 1
+            if state.baseline is None or latency < state.baseline:
+                state.baseline = latency
+            else:
+                state.baseline += (latency - state.baseline) * 0.01
+            if error or status in self.statuses or latency > self.tolerance * state.baseline:
+                if token > state.decreased:
+                    state.limit = max(self.min_limit, state.limit * self.backoff)
+                    state.decreased = state.sequence
+            elif busy:
+                # Only grow when the limit is actually being used
+                state.limit = min(self.max_limit, state.limit + 1.0 / state.limit)
+            state.cond.notify_all()
+
+    def limit(self, host):
+        return int(self._host(host).limit)
+
+    def queue_depth(self, host):
+        return self._host(host).waiting
+
+    def stats(self):
+        """ Returns the limit, requests in flight and requests waiting of each host. """
+        with self._lock:
+            hosts = self._hosts.items()
+        return dict((host, {'limit': int(state.limit), 'in_flight': state.in_flight,
+                            'waiting': state.waiting}) for host, state in hosts)
+
+    def __getstate__(self):
+        # Copies, such as the ones sent to worker processes, start with no hosts
+        state = dict(self.__dict__, _hosts={})
+        del state['_lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def _host(self, host):
+        with self._lock:
+            state = self._hosts.get(host)
+            if state is None:
+                state = self._hosts[host] = _HostState(float(self.initial))
+            return state
+
+class _HostState(object):
+    def __init__(self, limit):
+        self.limit = limit
+        self.baseline = None
+        self.in_flight = 0
+        self.waiting = 0
+        self.sequence = 0
+        self.decreased = 0
+        self.cond = threading.Condition()
@@ -0,0 +1,46 @@
+# Copyright (C) 2008 Abiquo Holdings S.L.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+class AdaptivePageSize(object):
+    """ Chooses the size of the next page from the ones already fetched.
+
+    The limit doubles while pages take less than 'latency' seconds and halves
+    when they take more than twice that, and it never goes over 'max_limit' or
+    over the number of items that fit in 'budget' bytes.
+    """
+    def __init__(self, limit, latency=1.0, budget=4 * 1024 * 1024, max_limit=1000):
+        self.latency = latency
+        self.budget = budget
+        self.max_limit = max_limit
+        self.item_size = None
+        self.limit = self._bound(limit)
+
+    def sized(self, items, size):
+        """ Records the encoded size in bytes of a number of items. """
+        if items:
+            self.item_size = max(1, size // items)
+            self.limit = self._bound(self.limit)
+
+    def observe(self, items, seconds):
+        """ Records the time it took to fetch a page with a number of items. """
+        if seconds > 2 * self.latency:
+            self.limit = self._bound(self.limit // 2)
+        elif seconds < self.latency and items >= self.limit:
+            self.limit = self._bound(self.limit * 2)
+        return self.limit
+
+    def _bound(self, limit):
+        if self.item_size:
+            limit = min(limit, self.budget // self.item_size)
+        return max(1, min(limit, self.max_limit))
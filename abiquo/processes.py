@@ -0,0 +1,207 @@
+# Copyright (C) 2008 Abiquo Holdings S.L.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import cPickle as pickle
+import multiprocessing
+
+from collections import deque
+from urlparse import parse_qsl, urlparse
+
+from abiquo.buffer import DONE, Buffer
+from abiquo.client import CompactDto, DtoContext, ObjectDto
+from abiquo.crawler import Crawler
+from abiquo.transport import Transport
+
+class ProcessPool(object):
+    """ Shards paginated listings and crawls across worker processes.
+
+    Decoding the responses and building the objects is CPU bound, so threads
+    can not use more than one core. Each worker process has its own transport,
+    with its own connection pool, and the credentials and settings of the given
+    client, whose auth must be picklable. A ConcurrencyLimiter of the client is
+    copied to each worker, so the limits are not shared between them. Items are
+    sent back to the parent as compact JSON and yielded as CompactDto views, or,
+    when a 'process' function is given, the worker applies it to the json of
+    each item and its result is yielded instead. The function must be defined at
+    module level so it can be sent to the workers.
+    """
+    def __init__(self, api, processes=None, pool_maxsize=None):
+        self.processes = processes or multiprocessing.cpu_count()
+        self.context = DtoContext(api.auth, api.verify, api.transport)
+        self.failures = []
+        transport = api.transport
+        settings = {'pool_connections': transport.pool_connections,
+                    'pool_maxsize': pool_maxsize or transport.pool_maxsize,
+                    'pool_block': transport.pool_block, 'keep_alive': transport.keep_alive,
+                    'host_limits': transport.host_limits, 'retry': transport.retry,
+                    'codec': transport.codec, 'timeout': transport.timeout,
+                    'limiter': transport.limiter}
+        self.config = (api.auth, api.verify, settings)
+        self.pool = multiprocessing.Pool(self.processes, initializer=_init_worker,
+                                         initargs=(self.config,))
+
+    def listing(self, collection, process=None, window=None):
+        """ Iterates a collection fetching and decoding its pages in the workers.
+
+        Items are yielded in order and at most 'window' pages (by default twice the
+        number of processes) are kept ahead of the one being consumed. The first
+        page must have been retrieved and include the total size.
+        """
+        link = collection._extract_link('next') if 'links' in collection.json else None
+        for json in collection.json['collection']:
+            yield self._result(json, process)
+        if not link:
+            return
+        if 'totalSize' not in collection.json:
+            raise TypeError('collection size is unknown')
+
+        query = dict(parse_qsl(urlparse(link['href']).query))
+        limit = int(query.get('limit', len(collection.json['collection'])))
+        start = int(query.get('startwith', len(collection.json['collection'])))
+        accept = link.get('type', collection.content_type)
+        tasks = ((link['href'], offset, limit, accept, process)
+                 for offset in xrange(start, collection.json['totalSize'], limit))
+        for items in self._ordered(_fetch_page, tasks, window):
+            for item in items:
+                yield self._wrap(item, process)
+
+    def crawl(self, root, path, workers=8, window=None, chunk=100):
+        """ Yields (path, item) tuples like Crawler.crawl, sharding the crawl by the
+        objects linked from the root with the first rel of the path.
+
+        Each shard is crawled in its own process with up to 'workers' concurrent
+        requests, and at most 'window' shards (by default the number of processes)
+        run at the same time. Items are sent back in chunks of 'chunk' as they are
+        found, and a shard waits while two of its chunks are pending, so memory
+        does not grow with the size of the shards. Objects reachable from several
+        shards are yielded once per shard.
+        """
+        path = tuple(path)
+        links = []
+        seen = set()
+        for link in root.find_links(path[0]) if 'links' in root.json else []:
+            if link['href'] not in seen:
+                seen.add(link['href'])
+                links.append(link)
+        shards = deque()
+        window = window or self.processes
+        try:
+            for link in links:
+                shards.append(self._shard(link, path, workers, chunk))
+                if len(shards) >= window:
+                    for result in self._shard_results(shards[0]):
+                        yield result
+                    shards.popleft()
+            while shards:
+                for result in self._shard_results(shards[0]):
+                    yield result
+                shards.popleft()
+        finally:
+            # Stops the shards still sending items
+            for process, buffer in shards:
+                buffer.close()
+
+    def close(self):
+        self.pool.close()
+        self.pool.join()
+
+    def terminate(self):
+        self.pool.terminate()
+        self.pool.join()
+
+    def _shard(self, link, path, workers, chunk):
+        buffer = Buffer(2, multiprocessing)
+        process = multiprocessing.Process(target=_crawl_shard,
+                args=(self.config, link, path, workers, chunk, buffer))
+        process.daemon = True
+        process.start()
+        return process, buffer
+
+    def _shard_results(self, shard):
+        process, buffer = shard
+        for kind, value in buffer.consume(1):
+            if kind == 'error':
+                raise value
+            elif kind == 'failures':
+                self.failures.extend(value)
+            else:
+                for rels, item in value:
+                    yield rels, self._wrap(item, None)
+        process.join()
+
+    def _ordered(self, function, tasks, window):
+        pending = deque()
+        window = window or self.processes * 2
+        try:
+            for task in tasks:
+                pending.append(self.pool.apply_async(function, task))
+                if len(pending) >= window:
+                    yield pending.popleft().get()
+            while pending:
+                yield pending.popleft().get()
+        finally:
+            # Results still pending are discarded by the pool when they arrive
+            pending.clear()
+
+    def _result(self, json, process):
+        return process(json) if process else CompactDto(json, self.context)
+
+    def _wrap(self, item, process):
+        return item if process else CompactDto(item, self.context)
+
+_worker = None
+
+def _init_worker(config):
+    global _worker
+    auth, verify, settings = config
+    _worker = ObjectDto({}, auth=auth, verify=verify, transport=Transport(**settings))
+
+def _fetch_page(href, offset, limit, accept, process):
+    page = _worker._fetch_page(href, offset, limit, accept)
+    if process:
+        return [process(json) for json in page.json['collection']]
+    dumps = _worker.transport.codec.dumps
+    return [dumps(json) for json in page.json['collection']]
+
+def _crawl_shard(config, link, path, workers, chunk, buffer):
+    _init_worker(config)
+    # The shard is crawled from a root that only has the link of the shard
+    root = _worker._item({'links': [dict(link, rel=path[0])]})
+    crawler = Crawler(workers=workers)
+    dumps = _worker.transport.codec.dumps
+    results = []
+    try:
+        for rels, item in crawler.crawl(root, path):
+            results.append((rels, dumps(item.json)))
+            if len(results) >= chunk:
+                if not buffer.put(('items', results)):
+                    # The parent stopped reading, so the chunks not sent yet are dropped
+                    buffer.queue.cancel_join_thread()
+                    return
+                results = []
+        if results:
+            buffer.put(('items', results))
+        # Exceptions are sent as text, as not all of them can be pickled
+        buffer.put(('failures', [f._replace(error=repr(f.error)) if f.error else f
+                                 for f in crawler.failures]))
+    except Exception as e:
+        buffer.put(('error', _sendable(e)))
+    buffer.put(('done', DONE))
+
+def _sendable(error):
+    try:
+        pickle.dumps(error, pickle.HIGHEST_PROTOCOL)
+        return error
+    except Exception:
+        return RuntimeError(repr(error))
@@ -0,0 +1,85 @@
+# Copyright (C) 2008 Abiquo Holdings S.L.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from abiquo.client import check_response
+
+class Query(object):
+    """ Builds the filtering, sorting and paging parameters of a collection request.
+
+    Every method returns a new query, so partial queries can be reused:
+
+        vms = Query(api.cloud.virtualmachines, accept=VMS_TYPE)
+        for vm in vms.has('web').order_by('name').limit(500):
+            ...
+    """
+    def __init__(self, client, accept=None, params=None):
+        self.client = client
+        self.accept = accept
+        self.params = params or {}
+
+    def has(self, text):
+        """ Only the items with the given text in any of their attributes. """
+        return self.where(has=text)
+
+    def where(self, **params):
+        """ Adds collection specific filters, such as datacenter or hypervisorType. """
+        return self._with(params)
+
+    def order_by(self, attribute, asc=True):
+        return self._with({'by': attribute, 'asc': 'true' if asc else 'false'})
+
+    def limit(self, limit):
+        return self._with({'limit': limit})
+
+    def offset(self, offset):
+        return self._with({'startwith': offset})
+
+    def get(self, headers=None):
+        """ Requests the first page and returns the (code, dto) tuple. """
+        return self.client.get(params=self.params, headers=self._headers(headers))
+
+    def __iter__(self):
+        return iter(self._first())
+
+    def prefetch(self, workers=4, window=None):
+        return self._first().prefetch(workers=workers, window=window)
+
+    def adaptive(self, latency=1.0, budget=4 * 1024 * 1024, max_limit=1000):
+        return self._first().adaptive(latency=latency, budget=budget, max_limit=max_limit)
+
+    def count(self):
+        """ Returns the size of the collection, requesting a single item page. """
+        return self.limit(1)._first().count()
+
+    def stream(self, headers=None):
+        return self.client.stream(params=self.params, headers=self._headers(headers))
+
+    def _first(self):
+        code, dto = self.get()
+        check_response(200, code, dto)
+        return dto
+
+    def _with(self, params):
+        merged = dict(self.params)
+        merged.update(params)
+        return Query(self.client, accept=self.accept, params=merged)
+
+    def _headers(self, headers):
+        headers = dict(headers or {})
+        if self.accept and not any(k.lower() == 'accept' for k in headers):
+            headers['accept'] = self.accept
+        return headers
+
+    def __repr__(self):
+        return 'Query(%s %s)' % (self.client.url, self.params)
@@ -0,0 +1,173 @@
+# Copyright (C) 2008 Abiquo Holdings S.L.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import base64
+import gzip
+import json
+import threading
+import time
+
+from collections import deque
+from urllib import urlencode
+from urlparse import parse_qsl, urlparse, urlunparse
+
+from requests.models import PreparedRequest, Response
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+from abiquo.transport import Transport
+
+# Headers that do not apply to the stored body, which is decoded and may be rewritten
+SKIPPED_HEADERS = frozenset(['connection', 'content-encoding', 'content-length', 'keep-alive',
+                             'transfer-encoding'])
+
+class Cassette(object):
+    """ Recorded requests and responses, stored as gzipped JSON lines.
+
+    The first line has the base URL of the recorded API, and each of the
+    following ones an interaction with its request, its response and the
+    seconds it took.
+    """
+    def __init__(self, base=None, interactions=None):
+        self.base = base
+        self.interactions = interactions or []
+
+    @classmethod
+    def load(cls, path):
+        with gzip.open(path, 'rb') as f:
+            lines = iter(f)
+            header = json.loads(next(lines))
+            return cls(header.get('base'), [json.loads(line) for line in lines])
+
+    def save(self, path):
+        with gzip.open(path, 'wb') as f:
+            f.write(json.dumps({'version': 1, 'base': self.base}) + '\n')
+            for interaction in self.interactions:
+                f.write(json.dumps(interaction, separators=(',', ':')) + '\n')
+
+def request_url(url, params=None):
+    """ Returns the URL with the params and its query parameters sorted. """
+    prepared = PreparedRequest()
+    prepared.prepare_url(url, params)
+    parsed = urlparse(prepared.url)
+    return urlunparse(parsed._replace(query=urlencode(sorted(parse_qsl(parsed.query, True)))))
+
+def accept_header(headers):
+    return next((v for k, v in (headers or {}).items() if k.lower() == 'accept'), None)
+
+class RecordingTransport(Transport):
+    """ Transport that records every request and response in a cassette.
+
+    The cassette is written to 'path' when the transport is closed or saved. The
+    'base' URL of the API is stored in it so the links can be rewritten when it
+    is replayed against a different one.
+    """
+    def __init__(self, path, base=None, **kwargs):
+        Transport.__init__(self, **kwargs)
+        self.path = path
+        self.cassette = Cassette(base)
+        self._lock = threading.Lock()
+
+    def _perform(self, method, url, **kwargs):
+        start = time.time()
+        response = Transport._perform(self, method, url, **kwargs)
+        content = response.content
+        elapsed = time.time() - start
+        try:
+            body = {'text': content.decode('utf-8')}
+        except UnicodeDecodeError:
+            body = {'base64': base64.b64encode(content)}
+        interaction = {'method': method.upper(),
+                       'url': request_url(url, kwargs.get('params')),
+                       'accept': accept_header(kwargs.get('headers')),
+                       'status': response.status_code,
+                       'reason': response.reason,
+                       'headers': dict((k, v) for k, v in response.headers.items()
+                                       if k.lower() not in SKIPPED_HEADERS),
+                       'body': body,
+                       'elapsed': round(elapsed, 6)}
+        with self._lock:
+            self.cassette.interactions.append(interaction)
+        return response
+
+    def save(self):
+        with self._lock:
+            self.cassette.save(self.path)
+
+    def close(self):
+        self.save()
+        Transport.close(self)
+
+class ReplayTransport(Transport):
+    """ Transport that answers the requests with the responses of a cassette.
+
+    No request reaches the network. Requests are matched by method, URL and
+    Accept header, and identical ones get their recorded responses in order,
+    starting over when all of them have been used. When 'base' is given, the
+    requests to it are matched with the ones recorded against the base of the
+    cassette, and the links in the responses are rewritten to point to it. With
+    'realtime' each response takes as long as it took when it was recorded.
+    """
+    def __init__(self, path, base=None, realtime=False, sleep=time.sleep, **kwargs):
+        Transport.__init__(self, **kwargs)
+        cassette = Cassette.load(path)
+        self.base = base
+        self.recorded_base = cassette.base
+        self.realtime = realtime
+        self.sleep = sleep
+        self.replayed = 0
+        self._responses = {}
+        for interaction in cassette.interactions:
+            key = (interaction['method'], interaction['url'], interaction['accept'])
+            self._responses.setdefault(key, deque()).append(interaction)
+        self._lock = threading.Lock()
+
+    def _perform(self, method, url, **kwargs):
+        url = request_url(url, kwargs.get('params'))
+        recorded_url = self._rewrite(url, self.base, self.recorded_base)
+        key = (method.upper(), recorded_url, accept_header(kwargs.get('headers')))
+        with self._lock:
+            responses = self._responses.get(key)
+            if not responses:
+                raise LookupError('no recorded response for %s %s' % (method.upper(), url))
+            interaction = responses[0]
+            responses.rotate(-1)
+            self.replayed += 1
+        if self.realtime:
+            self.sleep(interaction['elapsed'])
+        return self._response(interaction, url)
+
+    def _response(self, interaction, url):
+        body = interaction['body']
+        if 'text' in body:
+            content = self._rewrite(body['text'], self.recorded_base, self.base).encode('utf-8')
+        else:
+            content = base64.b64decode(body['base64'])
+        headers = CaseInsensitiveDict(interaction['headers'])
+        if 'location' in headers:
+            headers['location'] = self._rewrite(headers['location'], self.recorded_base, self.base)
+        response = Response()
+        response.status_code = interaction['status']
+        response.reason = interaction['reason']
+        response.headers = headers
+        response.encoding = get_encoding_from_headers(headers)
+        response.url = url
+        response._content = content
+        response._content_consumed = True
+        return response
+
+    def _rewrite(self, text, source, target):
+        if not source or not target or source == target:
+            return text
+        return text.replace(source.rstrip('/'), target.rstrip('/'))
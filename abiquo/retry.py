@@ -0,0 +1,90 @@
+# Copyright (C) 2008 Abiquo Holdings S.L.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import calendar
+import random
+import threading
+import time
+
+from email.utils import parsedate
+from requests.exceptions import ConnectionError, Timeout
+
+IDEMPOTENT_METHODS = frozenset(['get', 'head', 'options', 'put', 'delete'])
+
+class RetryPolicy(object):
+    """ Retries throttled and failed requests with exponential backoff and full jitter.
+
+    Idempotent requests are retried when they fail with a connection error or a
+    timeout, or when they get any of the given statuses. Other requests, such as
+    POST, are only retried when they get one of the 'rejected' statuses, which
+    mean that the server did not process them. The Retry-After header is honored
+    when present.
+    """
+    def __init__(self, retries=3, backoff=0.5, max_backoff=30, statuses=(429, 502, 503, 504),
+                 rejected=(429,), sleep=time.sleep):
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.statuses = frozenset(statuses)
+        self.rejected = frozenset(rejected)
+        self.sleep = sleep
+        self.retried = 0
+        self._lock = threading.Lock()
+
+    def call(self, send, method, url, **kwargs):
+        idempotent = method.lower() in IDEMPOTENT_METHODS
+        attempt = 0
+        while True:
+            try:
+                response = send(method, url, **kwargs)
+            except (ConnectionError, Timeout):
+                if not idempotent or attempt >= self.retries:
+                    raise
+                delay = self.delay(attempt)
+            else:
+                retryable = self.statuses if idempotent else self.rejected
+                if response.status_code not in retryable or attempt >= self.retries:
+                    return response
+                delay = self.delay(attempt, response.headers.get('retry-after'))
+                response.close()
+            with self._lock:
+                self.retried += 1
+            self.sleep(delay)
+            attempt += 1
+
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        del state['_lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def delay(self, attempt, retry_after=None):
+        if retry_after:
+            seconds = parse_retry_after(retry_after)
+            if seconds is not None:
+                return min(seconds, self.max_backoff)
+        return random.uniform(0, min(self.max_backoff, self.backoff * (2 ** attempt)))
+
+def parse_retry_after(value):
+    """ Returns the seconds to wait from a Retry-After header with seconds or an HTTP date. """
+    try:
+        return max(0, int(value))
+    except ValueError:
+        date = parsedate(value)
+        if date is None:
+            return None
+        return max(0, calendar.timegm(date) - time.time())
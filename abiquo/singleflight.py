@@ -0,0 +1,77 @@
+# Copyright (C) 2008 Abiquo Holdings S.L.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import threading
+
+from urllib import urlencode
+
+class SingleFlight(object):
+    """ Coalesces identical calls that are in flight at the same time.
+
+    The first caller of a key runs the call and the ones arriving while it is in
+    progress wait for it and get the same result (or exception). 'calls' counts
+    the calls actually run and 'coalesced' the ones merged into them.
+    """
+    def __init__(self):
+        self.calls = 0
+        self.coalesced = 0
+        self._flights = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, call):
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+                self.calls += 1
+            else:
+                self.coalesced += 1
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+        try:
+            flight.result = call()
+            return flight.result
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
+
+    def stats(self):
+        return {'calls': self.calls, 'coalesced': self.coalesced}
+
+class _Flight(object):
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+def request_key(url, params=None, headers=None, auth=None):
+    """ Identifies a GET by URL, params, headers and credentials. """
+    headers = tuple(sorted((k.lower(), v) for k, v in (headers or {}).items()))
+    return (url, urlencode(sorted((params or {}).items()), doseq=True), headers, auth_key(auth))
+
+def auth_key(auth):
+    """ Returns a hashable key for the credentials of a request. """
+    try:
+        hash(auth)
+        return auth
+    except TypeError:
+        return id(auth)
@@ -0,0 +1,102 @@
+# Copyright (C) 2008 Abiquo Holdings S.L.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import codecs
+import json
+import re
+
+WHITESPACE = re.compile(r'\s*')
+
+class CollectionParser(object):
+    """ Incremental parser for Abiquo collection documents.
+
+    Iterating the parser yields the items of the 'collection' array as soon as each
+    one has been completely received from the given chunks of bytes. The rest of the
+    top level attributes (such as 'links' and 'totalSize') are available in 'meta'
+    once they have been parsed, and all of them are there when the iteration ends.
+    """
+    def __init__(self, chunks, encoding='utf-8'):
+        self.meta = {}
+        self._chunks = iter(chunks)
+        self._decoder = codecs.getincrementaldecoder(encoding)()
+        self._json = json.JSONDecoder()
+        self._buffer = u''
+        self._pos = 0
+        self._eof = False
+
+    def __iter__(self):
+        self._expect(u'{')
+        while True:
+            char = self._peek()
+            if char == u'}':
+                return
+            if char == u',':
+                self._pos += 1
+                continue
+            key = self._value()
+            self._expect(u':')
+            if key != 'collection':
+                self.meta[key] = self._value()
+                continue
+            self._expect(u'[')
+            while True:
+                char = self._peek()
+                if char == u']':
+                    self._pos += 1
+                    break
+                if char == u',':
+                    self._pos += 1
+                    continue
+                yield self._value()
+
+    def _value(self):
+        scalar = self._peek() not in u'"{['
+        while True:
+            try:
+                value, end = self._json.raw_decode(self._buffer, self._pos)
+                # Numbers and literals may continue in the next chunk, as in '2.' and '5'
+                if not scalar or self._eof or self._delimited(end):
+                    self._pos = end
+                    return value
+            except ValueError:
+                if self._eof:
+                    raise
+            self._read()
+
+    def _delimited(self, end):
+        end = WHITESPACE.match(self._buffer, end).end()
+        return end < len(self._buffer) and self._buffer[end] in u',]}'
+
+    def _peek(self):
+        while True:
+            self._pos = WHITESPACE.match(self._buffer, self._pos).end()
+            if self._pos < len(self._buffer):
+                return self._buffer[self._pos]
+            if self._eof:
+                raise ValueError('unexpected end of collection document')
+            self._read()
+
+    def _expect(self, char):
+        if self._peek() != char:
+            raise ValueError("expected '%s' at position %s" % (char, self._pos))
+        self._pos += 1
+
+    def _read(self):
+        self._buffer = self._buffer[self._pos:]
+        self._pos = 0
+        try:
+            self._buffer += self._decoder.decode(next(self._chunks))
+        except StopIteration:
+            self._buffer += self._decoder.decode('', final=True)
+            self._eof = True
@@ -0,0 +1,115 @@
+# Copyright (C) 2008 Abiquo Holdings S.L.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import cPickle as pickle
+import os
+
+from collections import namedtuple
+
+from abiquo.client import check_response, digest
+
+Change = namedtuple('Change', ['kind', 'href', 'dto'])
+
+ADDED = 'added'
+CHANGED = 'changed'
+REMOVED = 'removed'
+
+class SyncIndex(object):
+    """ What was seen in each collection in the previous runs of a Sync.
+
+    'items' maps the href of each resource to the hash of its content, and
+    'collections' keeps, for each collection, the ETag, the hrefs and the next
+    link of each of its pages, so unchanged pages can be skipped altogether.
+    """
+    def __init__(self):
+        self.items = {}
+        self.collections = {}
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'rb') as f:
+            return pickle.load(f)
+
+    def save(self, path):
+        # Written to a temporary file first so an interrupted save keeps the old index
+        temporary = '%s.tmp' % path
+        with open(temporary, 'wb') as f:
+            pickle.dump(self, f, pickle.HIGHEST_PROTOCOL)
+        os.rename(temporary, path)
+
+class Sync(object):
+    """ Incremental synchronization of collections against a persistent index.
+
+    run() iterates a collection and yields a Change only for the resources added,
+    changed or removed since the previous run. Pages are requested with the ETag
+    they had in the previous run, and when the server answers with a 304 their
+    items are known to be unchanged without downloading or decoding them.
+    Resources are only reported as removed when the whole collection has been
+    iterated.
+    """
+    def __init__(self, index=None):
+        self.index = index or SyncIndex()
+        self.pages = 0
+        self.not_modified = 0
+
+    def run(self, client, accept, params=None):
+        key = (client.url, accept, tuple(sorted((params or {}).items())))
+        previous = self.index.collections.get(key, {})
+        pages = {}
+        seen = set()
+        url, type = client.url, accept
+        while url:
+            headers = {'accept': type}
+            stored = previous.get(url)
+            if stored and stored[0]:
+                headers['If-None-Match'] = stored[0]
+            code, page = client._child(url).get(params=params if url == client.url else None,
+                                                headers=headers)
+            self.pages += 1
+            if code == 304 and stored:
+                self.not_modified += 1
+                etag, hrefs, following = stored
+                pages[url] = stored
+                seen.update(hrefs)
+            else:
+                check_response(200, code, page)
+                hrefs = []
+                for json_object in page.json['collection']:
+                    dto = page._item(json_object)
+                    href = dto.identity()
+                    if href is None:
+                        continue
+                    change = self._compare(href, json_object)
+                    hrefs.append(href)
+                    seen.add(href)
+                    if change:
+                        yield Change(change, href, dto)
+                link = page._extract_link('next') if 'links' in page.json else None
+                following = (link['href'], link.get('type', type)) if link else None
+                pages[url] = (page.etag, hrefs, following)
+            url, type = following if following else (None, None)
+
+        for stored in previous.values():
+            for href in stored[1]:
+                if href not in seen and self.index.items.pop(href, None) is not None:
+                    yield Change(REMOVED, href, None)
+        self.index.collections[key] = pages
+
+    def _compare(self, href, json_object):
+        hashed = digest(json_object)
+        previous = self.index.items.get(href)
+        self.index.items[href] = hashed
+        if previous is None:
+            return ADDED
+        return CHANGED if previous != hashed else None
@@ -0,0 +1,196 @@
+# Copyright (C) 2008 Abiquo Holdings S.L.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import threading
+import time
+
+from concurrent.futures import Future
+
+from abiquo.client import Abiquo, ObjectDto, check_response
+
+TASK_TYPE = 'application/vnd.abiquo.task+json'
+TASKS_TYPE = 'application/vnd.abiquo.tasks+json'
+FINISHED_STATES = frozenset(['FINISHED_SUCCESSFULLY', 'FINISHED_UNSUCCESSFULLY', 'ABORTED',
+                             'CANCELLED'])
+
+def task_collection(href):
+    """ Groups the tasks by the task collection of their entity. """
+    return href.rsplit('/', 1)[0]
+
+class TaskPoller(object):
+    """ Waits for many asynchronous tasks with a single background poller.
+
+    watch() returns a future that is resolved with the task once it finishes.
+    Tasks are grouped with the 'group' function, which returns the URL of a
+    collection listing them, and a group with several pending tasks is polled
+    with a single request to that collection. Each group is polled every
+    'interval' seconds, backing off up to 'max_interval' while none of its tasks
+    change, and no more than 'rate' polls per second are sent overall, so the
+    traffic does not grow with the number of tasks being waited for.
+    """
+    def __init__(self, api, interval=1, max_interval=30, backoff=1.5, rate=10,
+                 group=task_collection):
+        self.api = api
+        self.interval = interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+        self.spacing = 1.0 / rate
+        self.group = group
+        self.requests = 0
+        self._groups = {}
+        self._next = 0
+        self._closed = False
+        self._thread = None
+        self._cond = threading.Condition()
+
+    def watch(self, task, callback=None):
+        """ Waits for a task, given as a task DTO, the accepted request of an
+        asynchronous operation, or the URL of the task. """
+        href = task_href(task)
+        with self._cond:
+            if self._closed:
+                raise RuntimeError('poller is closed')
+            key = self.group(href)
+            group = self._groups.get(key)
+            if group is None:
+                group = self._groups[key] = _Group(key, time.time() + self.interval)
+            group.interval = self.interval
+            future = group.tasks.get(href)
+            if future is None:
+                future = group.tasks[href] = Future()
+                future.set_running_or_notify_cancel()
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='abiquo-task-poller')
+                self._thread.daemon = True
+                self._thread.start()
+            self._cond.notify()
+        if callback:
+            future.add_done_callback(callback)
+        return future
+
+    def pending(self):
+        with self._cond:
+            return sum(len(group.tasks) for group in self._groups.values())
+
+    def close(self):
+        """ Stops polling. The futures of the tasks still pending fail with a RuntimeError. """
+        with self._cond:
+            self._closed = True
+            groups, self._groups = self._groups, {}
+            self._cond.notify()
+        for group in groups.values():
+            for future in group.tasks.values():
+                # Running futures can not be cancelled, so they are failed instead
+                future.set_exception(RuntimeError('poller is closed'))
+
+    def _run(self):
+        while True:
+            with self._cond:
+                group = self._due()
+                if group is None:
+                    self._thread = None
+                    return
+                self._next = time.time() + self.spacing
+                hrefs = list(group.tasks)
+            found, failed = self._poll(group.key, hrefs)
+            with self._cond:
+                if self._closed:
+                    self._thread = None
+                    return
+                changed = False
+                for href, dto in found.items():
+                    state = dto.json.get('state')
+                    changed = changed or group.states.get(href) != state
+                    group.states[href] = state
+                    if state in FINISHED_STATES:
+                        self._resolve(group, href).set_result(dto)
+                for href, error in failed.items():
+                    self._resolve(group, href).set_exception(error)
+                if not changed:
+                    group.interval = min(group.interval * self.backoff, self.max_interval)
+                else:
+                    group.interval = self.interval
+                group.due = time.time() + group.interval
+                if not group.tasks and self._groups.get(group.key) is group:
+                    del self._groups[group.key]
+
+    def _due(self):
+        # Waits until the next group is due, or returns None if there is nothing to do
+        while not self._closed and self._groups:
+            group = min(self._groups.values(), key=lambda group: group.due)
+            wait = max(group.due, self._next) - time.time()
+            if wait <= 0:
+                return group
+            self._cond.wait(wait)
+        return None
+
+    def _resolve(self, group, href):
+        group.states.pop(href, None)
+        return group.tasks.pop(href)
+
+    def _poll(self, key, hrefs):
+        found, failed = {}, {}
+        if len(hrefs) > 1:
+            try:
+                code, page = self._get(key, TASKS_TYPE)
+            except Exception:
+                code, page = None, None
+            if code == 200 and page is not None:
+                for json in page.json.get('collection', []):
+                    dto = page._item(json)
+                    href = task_href(dto, key)
+                    if href in hrefs:
+                        found[href] = dto
+        # Tasks not in the first page of the collection are polled individually
+        for href in hrefs:
+            if href in found:
+                continue
+            try:
+                code, dto = self._get(href, TASK_TYPE)
+            except Exception:
+                continue
+            if code == 200:
+                found[href] = dto
+            elif code == 404:
+                try:
+                    check_response(200, code, dto)
+                except Exception as e:
+                    failed[href] = e
+        return found, failed
+
+    def _get(self, url, accept):
+        self.requests += 1
+        return Abiquo(url, auth=self.api.auth, headers={'accept': accept},
+                verify=self.api.verify, transport=self.api.transport).get()
+
+class _Group(object):
+    def __init__(self, key, due):
+        self.key = key
+        self.due = due
+        self.interval = None
+        self.tasks = {}
+        self.states = {}
+
+def task_href(task, collection=None):
+    """ Returns the URL of a task DTO, the accepted request of an operation, or an URL. """
+    if not isinstance(task, ObjectDto):
+        return task
+    if 'links' in task.json:
+        for rel in ('status', 'self', 'edit'):
+            link = task._extract_link(rel)
+            if link:
+                return link['href']
+    if collection and 'taskId' in task.json:
+        return '%s/%s' % (collection, task.json['taskId'])
+    raise ValueError('object is not a task')
@@ -0,0 +1,119 @@
+# Copyright (C) 2008 Abiquo Holdings S.L.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import requests
+import time
+
+from requests.adapters import HTTPAdapter
+from urlparse import urlparse
+
+from abiquo.codec import DEFAULT_CODEC
+from abiquo.singleflight import request_key
+
+class Transport(object):
+    """ Pooled HTTP transport shared by a root client and all the nodes derived from it.
+
+    pool_connections is the number of per-host pools kept alive and pool_maxsize the
+    number of connections kept in each one. host_limits maps a host (or host:port) to
+    a hard limit of concurrent connections to that host; requests exceeding it block
+    until a connection is released. An optional ResponseCache, Instrumentation,
+    RetryPolicy and SingleFlight are shared by all the clients using the transport.
+    With a SingleFlight, identical GETs in flight at the same time share a single
+    response. The codec decodes and encodes the JSON documents; by default the
+    fastest one available is used. The timeout, in seconds or as a (connect, read)
+    tuple, applies to all the requests. A ConcurrencyLimiter bounds the requests
+    in flight to each host for all the clients and features using the transport.
+    """
+    def __init__(self, pool_connections=10, pool_maxsize=10, pool_block=False,
+                 keep_alive=True, host_limits=None, cache=None, instrumentation=None,
+                 retry=None, single_flight=None, codec=None, timeout=None, limiter=None):
+        self.pool_connections = pool_connections
+        self.pool_maxsize = pool_maxsize
+        self.pool_block = pool_block
+        self.keep_alive = keep_alive
+        self.host_limits = dict(host_limits or {})
+        self.codec = codec or DEFAULT_CODEC
+        self.limiter = limiter
+        self.timeout = timeout
+        self.cache = cache
+        self.instrumentation = instrumentation
+        self.retry = retry
+        self.single_flight = single_flight
+        self.session = requests.session()
+        self._mount(['http://', 'https://'], pool_connections, pool_maxsize, pool_block)
+        for host, limit in self.host_limits.items():
+            self._mount(['http://%s/' % host, 'https://%s/' % host], 1, limit, True)
+        if not keep_alive:
+            self.session.headers['Connection'] = 'close'
+
+    def request(self, method, url, coalesce=True, **kwargs):
+        if self.single_flight is not None and coalesce and method.lower() == 'get':
+            key = request_key(url, kwargs.get('params'), kwargs.get('headers'), kwargs.get('auth'))
+            return self.single_flight.do(key, lambda: self._read(method, url, **kwargs))
+        return self._send(method, url, **kwargs)
+
+    def _read(self, method, url, **kwargs):
+        # The body is read before sharing the response with the coalesced callers
+        response = self._send(method, url, **kwargs)
+        response.content
+        return response
+
+    def _send(self, method, url, **kwargs):
+        if self.timeout is not None:
+            kwargs.setdefault('timeout', self.timeout)
+        if self.retry is not None:
+            return self.retry.call(self._perform, method, url, **kwargs)
+        return self._perform(method, url, **kwargs)
+
+    def _perform(self, method, url, **kwargs):
+        if self.limiter is None:
+            return self.session.request(method, url, **kwargs)
+        host = urlparse(url).netloc
+        token = self.limiter.acquire(host)
+        start = time.time()
+        try:
+            response = self.session.request(method, url, **kwargs)
+        except Exception:
+            self.limiter.release(host, token, time.time() - start, error=True)
+            raise
+        release = lambda: self.limiter.release(host, token, time.time() - start,
+                                               status=response.status_code)
+        if kwargs.get('stream') and hasattr(response.raw, 'release_conn'):
+            self._release_after_body(response, release)
+        else:
+            release()
+        return response
+
+    def _release_after_body(self, response, release):
+        # A streamed body is read later, so the slot is held until the connection
+        # is released, when the body has been read or the response is closed
+        release_conn = response.raw.release_conn
+        released = []
+
+        def release_once():
+            release_conn()
+            if not released:
+                released.append(True)
+                release()
+        response.raw.release_conn = release_once
+
+    def close(self):
+        self.session.close()
+
+    def _mount(self, prefixes, pool_connections, pool_maxsize, pool_block):
+        adapter = HTTPAdapter(pool_connections=pool_connections,
+                              pool_maxsize=pool_maxsize,
+                              pool_block=pool_block)
+        for prefix in prefixes:
+            self.session.mount(prefix, adapter)
@@ -0,0 +1,37 @@
+# Copyright (C) 2008 Abiquo Holdings S.L.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+""" Compares the available JSON codecs on Abiquo-like collections.
+
+Run it from the project root with: python -m benchmarks.codecs
+"""
+
+import timeit
+
+from abiquo.codec import JsonCodec, available_codecs
+from benchmarks.memory import virtualmachine
+
+if __name__ == '__main__':
+    stdlib = JsonCodec()
+    print "%-12s %10s %14s %14s" % ('codec', 'page size', 'decode MB/s', 'encode MB/s')
+    for size in (25, 200, 1000):
+        page = {'totalSize': 50000, 'links': [], 'collection': [virtualmachine(i) for i in range(size)]}
+        payload = stdlib.dumps(page)
+        megabytes = len(payload) / 1024.0 / 1024.0
+        number = max(1, 2000 / size)
+        for codec in available_codecs():
+            decode = timeit.timeit(lambda: codec.loads(payload), number=number) / number
+            encode = timeit.timeit(lambda: codec.dumps(page), number=number) / number
+            print "%-12s %10d %14.1f %14.1f" % (codec.name, size, megabytes / decode, megabytes / encode)
@@ -0,0 +1,49 @@
+# Copyright (C) 2008 Abiquo Holdings S.L.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+""" Compares opening a session per navigated node with sharing the root transport.
+
+Run it from the project root with: python -m benchmarks.connections
+"""
+
+import time
+
+from abiquo.client import Abiquo
+from abiquo.transport import Transport
+from benchmarks.stub import StubServer
+
+def navigate(api, ids, transport_factory):
+    for id in ids:
+        node = Abiquo(api.url, transport=transport_factory())
+        code, dc = node.admin.datacenters(id).get()
+        dc.follow('edit').get()
+
+def run(server, label, transport_factory, ids):
+    server.reset()
+    start = time.time()
+    navigate(Abiquo(server.url), ids, transport_factory)
+    elapsed = time.time() - start
+    print "%-18s %6d requests %6d connections %8.2f ms/request" % (label,
+            server.requests, server.connections, elapsed * 1000 / server.requests)
+
+if __name__ == '__main__':
+    server = StubServer().start()
+    ids = range(1, 501)
+    shared = Transport()
+    try:
+        run(server, 'session per node', Transport, ids)
+        run(server, 'shared transport', lambda: shared, ids)
+    finally:
+        shared.close()
+        server.stop()
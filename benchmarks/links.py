@@ -0,0 +1,40 @@
+# Copyright (C) 2008 Abiquo Holdings S.L.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+""" Measures the cost of looking up links as the number of links in an object grows.
+
+Run it from the project root with: python -m benchmarks.links
+"""
+
+import timeit
+
+from abiquo.client import ObjectDto
+
+def linear(obj, rel):
+    return next((link for link in obj.json['links'] if link['rel'] == rel), None)
+
+def dto(count):
+    return ObjectDto({'links': [{'rel': 'rel%s' % i, 'type': 'application/json',
+        'href': 'http://localhost/api/resource/%s' % i} for i in range(count)]})
+
+if __name__ == '__main__':
+    print "%8s %16s %16s" % ('links', 'linear (us)', 'indexed (us)')
+    for count in (5, 20, 50, 200, 1000):
+        obj = dto(count)
+        rel = 'rel%s' % (count - 1)
+        number = 20000
+        scan = timeit.timeit(lambda: linear(obj, rel), number=number)
+        indexed = timeit.timeit(lambda: obj._extract_link(rel), number=number)
+        print "%8d %16.3f %16.3f" % (count, scan * 1e6 / number, indexed * 1e6 / number)
@@ -0,0 +1,66 @@
+# Copyright (C) 2008 Abiquo Holdings S.L.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+""" Compares the memory held per item by ObjectDto and CompactDto.
+
+Run it from the project root with: python -m benchmarks.memory
+"""
+
+import sys
+
+from abiquo.client import CompactDto, DtoContext, ObjectDto
+from abiquo.transport import Transport
+
+def virtualmachine(id):
+    href = 'http://localhost/api/cloud/virtualdatacenters/1/virtualappliances/1/virtualmachines/%s' % id
+    return {'id': id, 'name': 'vm-%s' % id, 'label': 'Virtual machine %s' % id, 'cpu': 2,
+            'ram': 2048, 'state': 'ON', 'uuid': '5e9f0d6c-8d11-4b2c-b1c4-%012d' % id,
+            'vdrpEnabled': True, 'vdrpPort': 5900 + id % 100, 'metadata': {'owner': 'ops'},
+            'links': [{'rel': rel, 'type': 'application/vnd.abiquo.%s+json' % rel,
+                       'href': '%s/%s' % (href, rel)}
+                      for rel in ('edit', 'state', 'tasks', 'nics', 'disks', 'volumes',
+                                  'hardwareprofile', 'network', 'metadata', 'template')]}
+
+def deep_size(obj, seen):
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(deep_size(k, seen) + deep_size(v, seen) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple)):
+        size += sum(deep_size(i, seen) for i in obj)
+    elif hasattr(obj, '__dict__'):
+        size += deep_size(obj.__dict__, seen)
+    elif hasattr(obj, '__slots__'):
+        size += sum(deep_size(getattr(obj, s), seen) for s in obj.__slots__ if hasattr(obj, s))
+    return size
+
+def per_item(items, shared):
+    seen = set(id(o) for o in shared)
+    return deep_size(items, seen) / float(len(items))
+
+if __name__ == '__main__':
+    count = 10000
+    transport = Transport()
+    auth = ('user', 'password')
+    context = DtoContext(auth, True, transport)
+    shared = [transport, auth, context]
+
+    dtos = [ObjectDto(virtualmachine(i), auth=auth, transport=transport) for i in range(count)]
+    compacts = [CompactDto(virtualmachine(i), context) for i in range(count)]
+
+    print "%-12s %10.0f bytes/item" % ('ObjectDto', per_item(dtos, shared))
+    print "%-12s %10.0f bytes/item" % ('CompactDto', per_item(compacts, shared))
@@ -0,0 +1,85 @@
+# Copyright (C) 2008 Abiquo Holdings S.L.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+""" Compares iterating a large collection in one process with sharding it across processes.
+
+The stub server runs in its own process and serves pre-rendered pages, so it is not
+the bottleneck. Run it from the project root with: python -m benchmarks.processes
+"""
+
+import multiprocessing
+import sys
+import time
+
+from abiquo.client import Abiquo
+from abiquo.processes import ProcessPool
+from benchmarks.stub import DATACENTERS_TYPE, StubHandler, StubServer
+
+class PrerenderedHandler(StubHandler):
+    def _send(self, code, body, content_type='application/json'):
+        payload = self.server.rendered.get(self.path)
+        if payload is None:
+            payload = self.server.rendered[self.path] = self.server.codec.dumps(body)
+        self.send_response(code)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+def serve(items, page_size, connection):
+    from abiquo.codec import JsonCodec
+    server = StubServer(items=items, page_size=page_size)
+    server.RequestHandlerClass = PrerenderedHandler
+    server.rendered = {}
+    server.codec = JsonCodec()
+    connection.send(server.url)
+    server.serve_forever()
+
+def sequential(url):
+    api = Abiquo(url, auth=('user', 'password'))
+    code, datacenters = api.admin.datacenters.get(headers={'accept': DATACENTERS_TYPE})
+    return sum(1 for dc in datacenters)
+
+def sharded(url, processes):
+    api = Abiquo(url, auth=('user', 'password'))
+    code, datacenters = api.admin.datacenters.get(headers={'accept': DATACENTERS_TYPE})
+    pool = ProcessPool(api, processes=processes)
+    try:
+        return sum(1 for dc in pool.listing(datacenters))
+    finally:
+        pool.close()
+
+if __name__ == '__main__':
+    items = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    page_size = int(sys.argv[2]) if len(sys.argv) > 2 else 500
+    parent, child = multiprocessing.Pipe()
+    server = multiprocessing.Process(target=serve, args=(items, page_size, child))
+    server.daemon = True
+    server.start()
+    url = parent.recv()
+
+    # Warms up the pre-rendered pages of the server
+    sequential(url)
+
+    print "%-12s %10s %12s" % ('mode', 'seconds', 'items/s')
+    start = time.time()
+    count = sequential(url)
+    elapsed = time.time() - start
+    print "%-12s %10.2f %12.0f" % ('sequential', elapsed, count / elapsed)
+    for processes in sorted(set([1, 2, 4, multiprocessing.cpu_count()])):
+        start = time.time()
+        count = sharded(url, processes)
+        elapsed = time.time() - start
+        print "%-12s %10.2f %12.0f" % ('%d processes' % processes, elapsed, count / elapsed)
+    server.terminate()
@@ -0,0 +1,141 @@
+# Copyright (C) 2008 Abiquo Holdings S.L.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import json
+import re
+import threading
+import time
+
+from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+from SocketServer import ThreadingMixIn
+from urlparse import urlparse, parse_qs
+
+DATACENTER_TYPE = 'application/vnd.abiquo.datacenter+json'
+DATACENTERS_TYPE = 'application/vnd.abiquo.datacenters+json'
+RACKS_TYPE = 'application/vnd.abiquo.racks+json'
+
+class StubServer(ThreadingMixIn, HTTPServer):
+    """ Local Abiquo-like API serving a paginated collection of datacenters.
+
+    The collection lives in /api/admin/datacenters, each item in
+    /api/admin/datacenters/{id} and its racks in /api/admin/datacenters/{id}/racks.
+    Every request is delayed by 'latency' seconds, and every new TCP connection is
+    counted so benchmarks can check how well the client reuses them.
+    """
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, items=1000, page_size=25, latency=0.0, port=0):
+        HTTPServer.__init__(self, ('127.0.0.1', port), StubHandler)
+        self.items = items
+        self.page_size = page_size
+        self.latency = latency
+        self.connections = 0
+        self.requests = 0
+        self._lock = threading.Lock()
+        self._thread = None
+
+    @property
+    def url(self):
+        return 'http://127.0.0.1:%s/api' % self.server_address[1]
+
+    def start(self):
+        self._thread = threading.Thread(target=self.serve_forever)
+        self._thread.daemon = True
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+    def reset(self):
+        with self._lock:
+            self.connections = 0
+            self.requests = 0
+
+    def process_request(self, request, client_address):
+        with self._lock:
+            self.connections += 1
+        ThreadingMixIn.process_request(self, request, client_address)
+
+    def count_request(self):
+        with self._lock:
+            self.requests += 1
+
+    def datacenter(self, id):
+        href = '%s/admin/datacenters/%s' % (self.url, id)
+        return {'id': id, 'name': 'dc-%s' % id, 'location': 'location-%s' % id,
+                'links': [{'rel': 'edit', 'type': DATACENTER_TYPE, 'href': href},
+                          {'rel': 'racks', 'type': RACKS_TYPE, 'href': '%s/racks' % href}]}
+
+    def racks(self, datacenter):
+        href = '%s/admin/datacenters/%s/racks' % (self.url, datacenter)
+        return {'totalSize': 2, 'links': [],
+                'collection': [{'id': i, 'name': 'rack-%s' % i,
+                                'links': [{'rel': 'edit', 'type': 'application/vnd.abiquo.rack+json',
+                                           'href': '%s/%s' % (href, i)}]} for i in (1, 2)]}
+
+    def datacenters(self, start, limit):
+        href = '%s/admin/datacenters' % self.url
+        links = []
+        if start + limit < self.items:
+            links.append({'rel': 'next', 'type': DATACENTERS_TYPE,
+                          'href': '%s?startwith=%s&limit=%s' % (href, start + limit, limit)})
+        end = min(start + limit, self.items)
+        return {'totalSize': self.items, 'links': links,
+                'collection': [self.datacenter(i) for i in range(start + 1, end + 1)]}
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+    wbufsize = -1
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        self.server.count_request()
+        if self.server.latency:
+            time.sleep(self.server.latency)
+        url = urlparse(self.path)
+        query = parse_qs(url.query)
+        match = re.match(r'^/api/admin/datacenters(?:/(\d+))?(/racks)?/?$', url.path)
+        if not match:
+            return self._send(404, {'collection': [{'code': 'NOT-FOUND', 'message': url.path}]})
+        if match.group(2):
+            return self._send(200, self.server.racks(int(match.group(1))), RACKS_TYPE)
+        if match.group(1):
+            return self._send(200, self.server.datacenter(int(match.group(1))), DATACENTER_TYPE)
+        start = int(query.get('startwith', [0])[0])
+        limit = int(query.get('limit', [self.server.page_size])[0])
+        self._send(200, self.server.datacenters(start, limit), DATACENTERS_TYPE)
+
+    def do_PUT(self):
+        self.server.count_request()
+        if self.server.latency:
+            time.sleep(self.server.latency)
+        length = int(self.headers.get('content-length', 0))
+        body = self.rfile.read(length) if length else '{}'
+        self._send(200, json.loads(body), self.headers.get('content-type'))
+
+    def _send(self, code, body, content_type='application/json'):
+        payload = json.dumps(body)
+        self.send_response(code)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+        self.wfile.flush()
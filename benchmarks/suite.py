@@ -0,0 +1,178 @@
+# Copyright (C) 2008 Abiquo Holdings S.L.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+""" Throughput and latency benchmarks of the main access patterns of the client.
+
+Each scenario runs in its own process against a local stub server, so peak memory
+figures are not polluted by the other scenarios or by the server. Throughput and
+memory are measured with a default client, so the usual request path is the one
+timed, and the latencies in a second pass with instrumentation. Results can be
+saved and compared with a previous run:
+
+    python -m benchmarks.suite --save before.json
+    python -m benchmarks.suite --compare before.json
+"""
+
+import argparse
+import json
+import resource
+import subprocess
+import sys
+import time
+
+from abiquo.client import Abiquo
+from abiquo.instrumentation import Instrumentation
+from abiquo.transport import Transport
+from benchmarks.memory import deep_size
+from benchmarks.stub import DATACENTERS_TYPE, StubServer
+
+def scenario_get(api, args):
+    for id in range(1, args.operations + 1):
+        api.admin.datacenters(id).get()
+    return args.operations
+
+def scenario_iterate(api, args):
+    code, datacenters = api.admin.datacenters.get(headers={'accept': DATACENTERS_TYPE})
+    return sum(1 for dc in datacenters)
+
+def scenario_prefetch(api, args):
+    code, datacenters = api.admin.datacenters.get(headers={'accept': DATACENTERS_TYPE})
+    return sum(1 for dc in datacenters.prefetch(workers=4))
+
+def scenario_stream(api, args):
+    return sum(1 for dc in api.admin.datacenters.stream(headers={'accept': DATACENTERS_TYPE}))
+
+def scenario_follow(api, args):
+    count = 0
+    for id in range(1, args.operations + 1):
+        code, dc = api.admin.datacenters(id).get()
+        code, edit = dc.follow('edit').get()
+        code, racks = edit.follow('racks').get()
+        count += len(racks.json['collection'])
+    return count
+
+def scenario_put(api, args):
+    for id in range(1, args.operations + 1):
+        code, dc = api.admin.datacenters(id).get()
+        dc.name = 'updated-%s' % id
+        dc.put()
+    return args.operations
+
+def scenario_retained(api, args):
+    code, datacenters = api.admin.datacenters.get(headers={'accept': DATACENTERS_TYPE})
+    items = list(datacenters)
+    shared = [api.transport, api.auth]
+    return len(items), deep_size(items, set(id(o) for o in shared)) / float(len(items))
+
+SCENARIOS = ['get', 'iterate', 'prefetch', 'stream', 'follow', 'put', 'retained']
+
+def percentile(values, p):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(p / 100.0 * (len(values) - 1))))]
+
+def run_scenario(name, url, args):
+    """ Runs a single scenario in the current process and returns its measures. """
+    scenario = globals()['scenario_%s' % name]
+    api = Abiquo(url, auth=('user', 'password'))
+    start = time.time()
+    result = scenario(api, args)
+    elapsed = time.time() - start
+    items, retained = result if isinstance(result, tuple) else (result, None)
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    # Instrumentation streams the responses and runs hooks, so it is kept out of the timed pass
+    latencies = []
+    instrumentation = Instrumentation(after=[lambda record: latencies.append(record.total)])
+    scenario(Abiquo(url, auth=('user', 'password'), transport=Transport(instrumentation=instrumentation)),
+             args)
+    return {'scenario': name,
+            'requests': len(latencies),
+            'items': items,
+            'seconds': elapsed,
+            'requests_per_second': len(latencies) / elapsed if elapsed else 0,
+            'items_per_second': items / elapsed if elapsed else 0,
+            'p50_ms': percentile(latencies, 50) * 1000,
+            'p99_ms': percentile(latencies, 99) * 1000,
+            'peak_rss_kb': peak_rss,
+            'retained_bytes_per_item': retained}
+
+def run_isolated(name, url, args):
+    command = [sys.executable, '-m', 'benchmarks.suite', '--worker', name, '--url', url,
+               '--operations', str(args.operations)]
+    return json.loads(subprocess.check_output(command))
+
+def best_of(runs):
+    # The fastest run is the least disturbed by the noise of the machine
+    return min(runs, key=lambda run: run['seconds'])
+
+def report(results, baseline=None):
+    print "%-10s %9s %9s %10s %10s %9s %9s %12s %10s" % ('scenario', 'requests', 'items',
+            'req/s', 'items/s', 'p50 ms', 'p99 ms', 'peak rss kb', 'bytes/item')
+    for result in results:
+        print "%-10s %9d %9d %10.1f %10.1f %9.2f %9.2f %12d %10s" % (result['scenario'],
+                result['requests'], result['items'], result['requests_per_second'],
+                result['items_per_second'], result['p50_ms'], result['p99_ms'],
+                result['peak_rss_kb'], '%.0f' % result['retained_bytes_per_item']
+                if result['retained_bytes_per_item'] else '-')
+        previous = (baseline or {}).get(result['scenario'])
+        if previous:
+            print "%-10s %9s %9s %+9.1f%% %+9.1f%% %+8.1f%% %+8.1f%% %+11.1f%%" % ('', '', '',
+                    change(previous['requests_per_second'], result['requests_per_second']),
+                    change(previous['items_per_second'], result['items_per_second']),
+                    change(previous['p50_ms'], result['p50_ms']),
+                    change(previous['p99_ms'], result['p99_ms']),
+                    change(previous['peak_rss_kb'], result['peak_rss_kb']))
+
+def change(before, after):
+    return (after - before) * 100.0 / before if before else 0.0
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Abiquo client benchmark suite')
+    parser.add_argument('--items', type=int, default=5000, help='items in the stub collection')
+    parser.add_argument('--page-size', type=int, default=100, help='default page size of the stub')
+    parser.add_argument('--latency', type=float, default=0.0, help='stub latency in seconds')
+    parser.add_argument('--operations', type=int, default=500, help='operations per scenario')
+    parser.add_argument('--repeat', type=int, default=3, help='runs per scenario, the best is kept')
+    parser.add_argument('--scenarios', default=','.join(SCENARIOS), help='comma separated scenarios')
+    parser.add_argument('--save', help='file where the results are saved as JSON')
+    parser.add_argument('--compare', help='results of a previous run to compare with')
+    parser.add_argument('--worker', help=argparse.SUPPRESS)
+    parser.add_argument('--url', help=argparse.SUPPRESS)
+    return parser.parse_args()
+
+if __name__ == '__main__':
+    args = parse_args()
+    if args.worker:
+        print json.dumps(run_scenario(args.worker, args.url, args))
+        sys.exit(0)
+
+    server = StubServer(items=args.items, page_size=args.page_size, latency=args.latency).start()
+    try:
+        results = [best_of([run_isolated(name, server.url, args) for i in range(args.repeat)])
+                   for name in args.scenarios.split(',')]
+    finally:
+        server.stop()
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = dict((result['scenario'], result) for result in json.load(f)['results'])
+    report(results, baseline)
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump({'settings': {'items': args.items, 'page_size': args.page_size,
+                                    'latency': args.latency, 'operations': args.operations},
+                       'results': results}, f, indent=2)
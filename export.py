@@ -0,0 +1,62 @@
+# Copyright (C) 2008 Abiquo Holdings S.L.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import argparse
+import getpass
+import sys
+
+from abiquo.auth import BearerTokenAuth
+from abiquo.client import Abiquo, check_response
+from abiquo.export import Exporter
+
+def export(api, path, accept, out, format='ndjson', fields=None, limit=None, batch=500):
+    """ Exports the collection at the given path of the API and returns the items written. """
+    params = {'limit': limit} if limit else None
+    code, collection = api(*[p for p in path.split('/') if p]).get(params=params,
+            headers={'Accept': accept})
+    check_response(200, code, collection)
+    exporter = Exporter(fields=fields, batch=batch)
+    return getattr(exporter, format)(collection, out)
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Exports an Abiquo API collection to NDJSON or CSV')
+    parser.add_argument('api_url', help='Abiquo API endpoint')
+    parser.add_argument('path', help='path of the collection, such as cloud/virtualmachines')
+    parser.add_argument('accept', help='media type of the collection')
+    parser.add_argument('--user', required=True,
+            help='username or OpenID access_token (prefixed with "openid:")')
+    parser.add_argument('--format', choices=['ndjson', 'csv'], default='ndjson')
+    parser.add_argument('--fields', help='comma separated attributes, such as name,location.city')
+    parser.add_argument('--output', help='file to write to, by default the standard output')
+    parser.add_argument('--limit', type=int, help='items per page')
+    parser.add_argument('--batch', type=int, default=500, help='items per write')
+    return parser.parse_args()
+
+if __name__ == '__main__':
+    args = parse_args()
+    if args.user.startswith('openid:'):
+        auth = BearerTokenAuth(args.user[7:])
+    else:
+        auth = (args.user, getpass.getpass('Password: '))
+    api = Abiquo(args.api_url, auth=auth)
+    out = open(args.output, 'wb') if args.output else sys.stdout
+    try:
+        count = export(api, args.path, args.accept, out, format=args.format,
+                fields=args.fields.split(',') if args.fields else None,
+                limit=args.limit, batch=args.batch)
+    finally:
+        if args.output:
+            out.close()
+        api.close()
+    sys.stderr.write('Exported %s items\n' % count)
@@ -44,6 +44,7 @@ setup(
     keywords='abiquo api rest',
     install_requires=[
         'requests >= 2.0.0',
+        'futures >= 3.0.0',
         'requests_oauthlib >= 0.4.2'
     ],
     classifiers=[
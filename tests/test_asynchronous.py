@@ -0,0 +1,72 @@
+# Copyright (C) 2008 Abiquo Holdings S.L.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+import httpretty
+import json
+import unittest
+
+from . import *
+from abiquo.asynchronous import AsyncAbiquo, AsyncObjectDto
+
+class TestAsynchronous(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        httpretty.enable()
+        cls.api = AsyncAbiquo(url="http://fake/api", auth=('user', 'name'), workers=1)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.api.close()
+        httpretty.disable()
+
+    def test_path_building(self):
+        self.assertEqual(self.api.admin.datacenters(1).url, 'http://fake/api/admin/datacenters/1')
+        self.assertIsInstance(self.api.admin.datacenters, AsyncAbiquo)
+        self.assertIs(self.api.admin.datacenters(1).executor, self.api.executor)
+        self.assertIs(self.api('admin', 'datacenters').transport, self.api.transport)
+
+    def test_get_returns_future(self):
+        data = {'foo': 'bar', 'links': [{'rel': 'edit', 'href': 'http://fake/api/admin/datacenters/42',
+            'type': 'application/vnd.abiquo.datacenter+json'}]}
+        register('GET', 'http://fake/api/admin/datacenters/42', 200, json.dumps(data))
+        register('PUT', 'http://fake/api/admin/datacenters/42', 200, json.dumps(data))
+
+        code, dc = self.api.admin.datacenters.get(id='42').result()
+        self.assertEqual(code, 200)
+        self.assertIsInstance(dc, AsyncObjectDto)
+        self.assertIs(dc.executor, self.api.executor)
+
+        code, refreshed = dc.refresh().result()
+        assert_request(self, '/api/admin/datacenters/42', method='GET',
+                headers={'accept': 'application/vnd.abiquo.datacenter+json'})
+        self.assertEqual(refreshed.foo, 'bar')
+
+        dc.foo = 'updated'
+        code, updated = dc.put().result()
+        assert_request(self, '/api/admin/datacenters/42', method='PUT')
+        self.assertEqual(code, 200)
+
+    def test_iteration(self):
+        register('GET', 'http://fake/api/admin/datacenters', 200,
+                json.dumps({'links': [], 'collection': [{'id': 3}]}))
+
+        first = AsyncObjectDto({'collection': [{'id': 1}, {'id': 2}],
+            'links': [{'rel': 'next', 'type': 'application/vnd.abiquo.datacenters+json',
+                       'href': 'http://fake/api/admin/datacenters?startwith=2&limit=2'}]},
+            executor=self.api.executor)
+
+        items = list(first)
+        self.assertEqual([dc.id for dc in items], [1, 2, 3])
+        self.assertTrue(all(isinstance(dc, AsyncObjectDto) for dc in items))
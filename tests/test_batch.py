@@ -0,0 +1,67 @@
+# Copyright (C) 2008 Abiquo Holdings S.L.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+import httpretty
+import time
+import unittest
+
+from . import *
+from abiquo.batch import Batch, Operation, RateLimiter
+from abiquo.client import ObjectDto
+
+class TestBatch(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        httpretty.enable()
+
+    @classmethod
+    def tearDownClass(cls):
+        httpretty.disable()
+
+    def test_collects_results_and_failures(self):
+        def fail():
+            raise ValueError('boom')
+        operations = [lambda: (201, 'a'), lambda: (409, None), fail, lambda: (204, None)]
+
+        batch = Batch(workers=2)
+        results = sorted(batch.run(operations), key=lambda r: r.index)
+
+        self.assertEqual([r.code for r in results], [201, 409, None, 204])
+        self.assertEqual([r.ok for r in results], [True, False, False, True])
+        self.assertIsInstance(results[2].error, ValueError)
+        self.assertEqual(sorted(r.index for r in batch.failures), [1, 2])
+
+    def test_operations(self):
+        register('POST', 'http://fake/api/batch/racks', 201, '{"name": "rack"}')
+        register('DELETE', 'http://fake/api/batch/racks/1', 204, '')
+
+        rack = ObjectDto({'links': [{'rel': 'edit', 'type': 'a', 'href': 'http://fake/api/batch/racks/1'}]})
+        create = Operation(api.batch.racks, 'post', data='{"name": "rack"}')
+        delete = Operation(rack, 'delete')
+        self.assertEqual(create.url, 'http://fake/api/batch/racks')
+        self.assertEqual(delete.url, 'http://fake/api/batch/racks/1')
+
+        results = sorted(Batch(workers=1, rate=100).run([create, delete]), key=lambda r: r.index)
+
+        self.assertEqual([r.code for r in results], [201, 204])
+        self.assertEqual(results[0].dto.name, 'rack')
+
+    def test_rate_limiter(self):
+        limiter = RateLimiter(rate=50)
+        start = time.time()
+        for i in range(5):
+            limiter.acquire('fake')
+        limiter.acquire('other')
+        self.assertGreaterEqual(time.time() - start, 4 * 0.02 - 0.005)
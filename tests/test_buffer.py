@@ -0,0 +1,55 @@
+# Copyright (C) 2008 Abiquo Holdings S.L.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import pickle
+import threading
+import unittest
+
+from abiquo.buffer import DONE, Buffer, Raised
+
+class TestBuffer(unittest.TestCase):
+    def test_consumes_all_producers(self):
+        buffer = Buffer(2)
+        threads = [threading.Thread(target=buffer.produce, args=(tag, range(5))) for tag in 'ab']
+        for thread in threads:
+            thread.start()
+        items = sorted(buffer.consume(2))
+        for thread in threads:
+            thread.join()
+        self.assertEqual(items, sorted((tag, i) for tag in 'ab' for i in range(5)))
+
+    def test_errors_keep_traceback(self):
+        def failing():
+            yield 1
+            raise ValueError('boom')
+        buffer = Buffer(10)
+        buffer.produce('a', failing())
+        items = list(buffer.consume(1))
+        self.assertEqual(items[0], ('a', 1))
+        raised = items[1][1]
+        self.assertIsInstance(raised, Raised)
+        self.assertIsInstance(raised.value, ValueError)
+        self.assertIsNotNone(raised.traceback)
+
+    def test_close_stops_producers(self):
+        buffer = Buffer(1)
+        thread = threading.Thread(target=buffer.produce, args=('a', xrange(1000)))
+        thread.start()
+        self.assertEqual(next(buffer.consume(1)), ('a', 0))
+        buffer.close()
+        thread.join(5)
+        self.assertFalse(thread.is_alive())
+
+    def test_done_survives_pickling(self):
+        self.assertIs(pickle.loads(pickle.dumps(DONE, 2)), DONE)
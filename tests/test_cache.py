@@ -0,0 +1,142 @@
+# Copyright (C) 2008 Abiquo Holdings S.L.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+import httpretty
+import json
+import time
+import unittest
+
+from . import *
+from abiquo.cache import ResponseCache
+from abiquo.client import Abiquo
+from abiquo.transport import Transport
+
+class TestCache(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        httpretty.enable()
+
+    @classmethod
+    def tearDownClass(cls):
+        httpretty.disable()
+
+    def setUp(self):
+        self.cache = ResponseCache()
+        self.api = Abiquo(url="http://fake/api", transport=Transport(cache=self.cache))
+
+    def register_etag(self, uri, etag, body):
+        def respond(request, uri, headers):
+            headers['etag'] = etag
+            if request.headers.get('if-none-match') == etag:
+                return (304, headers, '')
+            return (200, headers, json.dumps(body))
+        httpretty.register_uri('GET', uri, body=respond)
+
+    def test_revalidates_with_etag(self):
+        self.register_etag('http://fake/api/cache/datacenters/1', '"v1"', {'name': 'dc'})
+
+        code, first = self.api.cache.datacenters(1).get()
+        code, second = self.api.cache.datacenters(1).get()
+
+        assert_request(self, '/api/cache/datacenters/1', method='GET', headers={'if-none-match': '"v1"'})
+        self.assertEqual(code, 200)
+        self.assertIsNot(first, second)
+        self.assertEqual(first.json, second.json)
+        self.assertEqual(second.etag, '"v1"')
+        self.assertEqual(self.cache.misses, 1)
+        self.assertEqual(self.cache.revalidations, 1)
+        self.assertGreater(self.cache.bytes_saved, 0)
+
+    def test_key_includes_accept_and_params(self):
+        self.register_etag('http://fake/api/cache/racks', '"v1"', {'name': 'rack'})
+
+        self.api.cache.racks.get(headers={'Accept': 'a'})
+        self.api.cache.racks.get(headers={'Accept': 'b'})
+        self.api.cache.racks.get(headers={'Accept': 'b'}, params={'limit': 1})
+        self.api.cache.racks.get(headers={'Accept': 'b'}, params={'has': ['x', 'y']})
+        self.api.cache.racks.get(headers={'Accept': 'b'}, params={'has': ['x', 'z']})
+
+        self.assertEqual(self.cache.misses, 5)
+        self.assertEqual(len(self.cache), 5)
+
+    def test_fresh_entries_skip_request(self):
+        self.cache.fresh_for = 60
+        register('GET', 'http://fake/api/cache/enterprises/1', 200, json.dumps({'name': 'ent'}))
+
+        code, first = self.api.cache.enterprises(1).get()
+        requests_before = len(httpretty.latest_requests())
+        code, second = self.api.cache.enterprises(1).get()
+
+        self.assertEqual(len(httpretty.latest_requests()), requests_before)
+        self.assertIsNot(first, second)
+        self.assertEqual(second.name, 'ent')
+        self.assertEqual(self.cache.hits, 1)
+
+    def test_callers_get_their_own_objects(self):
+        self.cache.fresh_for = 60
+        register('GET', 'http://fake/api/cache/enterprises/2', 200, json.dumps({'name': 'ent'}))
+
+        code, first = self.api.cache.enterprises(2).get()
+        first.name = 'local-edit'
+        code, second = self.api.cache.enterprises(2).get()
+
+        self.assertEqual(second.name, 'ent')
+        self.assertEqual(second.changed_fields(), set())
+
+    def test_key_includes_credentials(self):
+        self.cache.fresh_for = 60
+        def me(request, uri, headers):
+            return (200, headers, json.dumps({'name': request.headers.get('authorization')}))
+        httpretty.register_uri('GET', 'http://fake/api/cache/me', body=me)
+        transport = Transport(cache=self.cache)
+        alice = Abiquo(url='http://fake/api', auth=('alice', 'a'), transport=transport)
+        bob = Abiquo(url='http://fake/api', auth=('bob', 'b'), transport=transport)
+
+        code, first = alice.cache.me.get()
+        code, second = bob.cache.me.get()
+        anonymous = Abiquo(url='http://fake/api', transport=transport)
+        code, token = anonymous.cache.me.get(headers={'Authorization': 'Bearer t'})
+        code, other = anonymous.cache.me.get(headers={'Authorization': 'Bearer u'})
+
+        self.assertNotEqual(first.name, second.name)
+        self.assertEqual((token.name, other.name), ('Bearer t', 'Bearer u'))
+        self.assertEqual(self.cache.misses, 4)
+
+    def test_writes_invalidate(self):
+        self.register_etag('http://fake/api/cache/datacenters/2', '"v1"', {'name': 'dc'})
+        register('PUT', 'http://fake/api/cache/datacenters/2', 200, '{}')
+
+        self.api.cache.datacenters(2).get()
+        self.api.cache.datacenters(2).put(data='{}')
+
+        self.assertEqual(len(self.cache), 0)
+
+    def test_eviction(self):
+        cache = ResponseCache(max_entries=2, ttl=0.05)
+        response = FakeResponse('{"a": 1}', etag='"x"')
+        for i in range(3):
+            cache.store(('url%s' % i, None, ''), response)
+
+        self.assertEqual(len(cache), 2)
+        self.assertEqual(cache.evictions, 1)
+        self.assertIsNone(cache.get(('url0', None, '')))
+        time.sleep(0.1)
+        self.assertIsNone(cache.get(('url2', None, '')))
+
+class FakeResponse(object):
+    def __init__(self, content, status_code=200, etag=None):
+        self.content = content
+        self.status_code = status_code
+        self.headers = {'etag': etag, 'content-type': 'application/json'}
@@ -194,3 +194,16 @@ class TestClient(unittest.TestCase):
         cli.post(headers={'h1':'c', 'h2':'b'})
         assert_request(self, '/api', method='POST', headers={'h1':'c', 'h2':'b'})
 
+    def test_derived_nodes_share_transport(self):
+        register('GET', 'http://fake/api/admin/datacenters/1', 200, json.dumps({'links': [
+            {'rel': 'racks', 'type': 'application/vnd.abiquo.racks+json',
+             'href': 'http://fake/api/admin/datacenters/1/racks'}]}))
+
+        cli = Abiquo(url="http://fake/api", auth=('user', 'name'))
+        self.assertIs(cli.admin.transport, cli.transport)
+        self.assertIs(cli.admin.datacenters(1).transport, cli.transport)
+        self.assertIs(cli('admin', 'datacenters').session, cli.session)
+
+        code, dc = cli.admin.datacenters.get(id='1')
+        self.assertIs(dc.transport, cli.transport)
+        self.assertIs(dc.follow('racks').transport, cli.transport)
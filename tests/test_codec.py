@@ -0,0 +1,73 @@
+# Copyright (C) 2008 Abiquo Holdings S.L.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+import httpretty
+import json
+import unittest
+
+from . import *
+from abiquo.client import Abiquo, CompactDto, DtoContext
+from abiquo.codec import JsonCodec, available_codecs
+from abiquo.transport import Transport
+
+class CountingCodec(JsonCodec):
+    def __init__(self):
+        self.decoded = 0
+        self.encoded = 0
+
+    def loads(self, data):
+        self.decoded += 1
+        return JsonCodec.loads(self, data)
+
+    def dumps(self, obj):
+        self.encoded += 1
+        return JsonCodec.dumps(self, obj)
+
+class TestCodec(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        httpretty.enable()
+
+    @classmethod
+    def tearDownClass(cls):
+        httpretty.disable()
+
+    def test_available_codecs(self):
+        codecs = available_codecs()
+        self.assertIsInstance(codecs[-1], JsonCodec)
+        for codec in codecs:
+            document = {'name': u'dc \xe9', 'links': [{'href': 'http://fake/api/admin'}], 'id': 1}
+            self.assertEqual(codec.loads(codec.dumps(document)), document)
+            self.assertEqual(codec.loads(json.dumps(document).encode('utf-8')), document)
+
+    def test_transport_codec(self):
+        data = {'name': 'dc', 'links': [{'rel': 'edit', 'href': 'http://fake/api/codec/datacenters/1',
+            'type': 'application/vnd.abiquo.datacenter+json'}]}
+        register('GET', 'http://fake/api/codec/datacenters/1', 200, json.dumps(data))
+        register('PUT', 'http://fake/api/codec/datacenters/1', 200, json.dumps(data))
+
+        codec = CountingCodec()
+        cli = Abiquo(url="http://fake/api", transport=Transport(codec=codec))
+        code, dc = cli.codec.datacenters(1).get()
+        dc.put(force=True)
+
+        self.assertEqual(httpretty.last_request().body, JsonCodec().dumps(data))
+        self.assertEqual(codec.decoded, 2)
+        self.assertEqual(codec.encoded, 1)
+
+        compact = CompactDto(data, DtoContext(transport=cli.transport))
+        self.assertEqual(compact.name, 'dc')
+        self.assertEqual(codec.encoded, 2)
+        self.assertEqual(codec.decoded, 3)
@@ -0,0 +1,101 @@
+# Copyright (C) 2008 Abiquo Holdings S.L.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+import httpretty
+import json
+import unittest
+
+from . import *
+from abiquo.client import ObjectDto
+from abiquo.crawler import Crawler
+
+def link(rel, href, type='application/json'):
+    return {'rel': rel, 'href': 'http://fake/api/crawl/%s' % href, 'type': type}
+
+def vdc(id):
+    return {'id': id, 'links': [link('edit', 'vdcs/%s' % id), link('datacenter', 'datacenters/1')]}
+
+class TestCrawler(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        httpretty.enable()
+
+    @classmethod
+    def tearDownClass(cls):
+        httpretty.disable()
+
+    def test_crawl(self):
+        requests = []
+        def respond(body):
+            def callback(request, uri, headers):
+                requests.append(uri)
+                return (200, headers, json.dumps(body))
+            return callback
+        httpretty.register_uri('GET', 'http://fake/api/crawl/vdcs',
+                body=respond({'collection': [vdc(1), vdc(2)], 'links': [link('next', 'vdcs/page2')]}))
+        httpretty.register_uri('GET', 'http://fake/api/crawl/vdcs/page2',
+                body=respond({'collection': [vdc(2), vdc(3)], 'links': []}))
+        httpretty.register_uri('GET', 'http://fake/api/crawl/datacenters/1',
+                body=respond({'id': 1, 'links': [link('edit', 'datacenters/1')]}))
+
+        root = ObjectDto({'links': [link('virtualdatacenters', 'vdcs')]})
+        crawler = Crawler(workers=1)
+        results = list(crawler.crawl(root, ['virtualdatacenters', 'datacenter']))
+
+        self.assertEqual([(path, dto.id) for path, dto in results], [
+            (('virtualdatacenters',), 1), (('virtualdatacenters',), 2),
+            (('virtualdatacenters',), 3), (('virtualdatacenters', 'datacenter'), 1)])
+        self.assertEqual(len(requests), 3)
+        self.assertEqual(crawler.failures, [])
+
+    def test_failures(self):
+        register('GET', 'http://fake/api/crawl/missing', 404, '')
+
+        root = ObjectDto({'links': [link('racks', 'missing')]})
+        crawler = Crawler(workers=2)
+
+        self.assertEqual(list(crawler.crawl(root, ['racks'])), [])
+        self.assertEqual(crawler.failures[0].code, 404)
+        self.assertEqual(crawler.failures[0].href, 'http://fake/api/crawl/missing')
+
+    def test_max_pending(self):
+        def vapps(vdc):
+            return {'collection': [{'id': '%s-%s' % (vdc, i), 'links': [
+                link('edit', 'vapps/%s/%s' % (vdc, i)), link('vm', 'vms/%s/%s' % (vdc, i))]}
+                for i in range(5)], 'links': []}
+        register('GET', 'http://fake/api/crawl/pressure/vdcs', 200, json.dumps({'collection': [
+            {'id': i, 'links': [link('edit', 'pressure/vdcs/%s' % i), link('vapps', 'vapps/%s' % i)]}
+            for i in range(5)], 'links': []}))
+        for vdc in range(5):
+            register('GET', 'http://fake/api/crawl/vapps/%s' % vdc, 200, json.dumps(vapps(vdc)))
+            for i in range(5):
+                register('GET', 'http://fake/api/crawl/vms/%s/%s' % (vdc, i), 200,
+                        json.dumps({'id': 'vm', 'links': []}))
+
+        class Peak(Crawler):
+            peak = 0
+            def _enqueue(self, depth, href, type, visited, queue):
+                Crawler._enqueue(self, depth, href, type, visited, queue)
+                self.peak = max(self.peak, len(queue))
+
+        root = ObjectDto({'links': [link('virtualdatacenters', 'pressure/vdcs')]})
+        path = ['virtualdatacenters', 'vapps', 'vm']
+        unbounded = Peak(workers=1)
+        bounded = Peak(workers=1, max_pending=3)
+        expected = sorted(dto.id for rels, dto in unbounded.crawl(root, path))
+        self.assertEqual(sorted(dto.id for rels, dto in bounded.crawl(root, path)), expected)
+        self.assertEqual(len(expected), 55)
+        self.assertLessEqual(bounded.peak, 3 + 5)
+        self.assertGreater(unbounded.peak, bounded.peak)
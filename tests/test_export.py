@@ -0,0 +1,62 @@
+# Copyright (C) 2008 Abiquo Holdings S.L.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+import json
+import sys
+import traceback
+import unittest
+
+from StringIO import StringIO
+
+from abiquo.client import ObjectDto
+from abiquo.export import Exporter
+
+def datacenters():
+    return ObjectDto({'links': [], 'collection': [
+        {'id': 1, 'name': u'Barcelona \xe9', 'location': {'city': 'bcn'}, 'links': []},
+        {'id': 2, 'name': 'Madrid', 'links': []}]})
+
+class TestExport(unittest.TestCase):
+    def test_ndjson(self):
+        out = StringIO()
+        self.assertEqual(Exporter(fields=['id', 'location.city'], batch=1).ndjson(datacenters(), out), 2)
+        lines = [json.loads(line) for line in out.getvalue().splitlines()]
+        self.assertEqual(lines, [{'id': 1, 'location.city': 'bcn'}, {'id': 2, 'location.city': None}])
+
+        out = StringIO()
+        Exporter().ndjson(datacenters(), out)
+        self.assertEqual(json.loads(out.getvalue().splitlines()[1])['name'], 'Madrid')
+
+    def test_csv(self):
+        out = StringIO()
+        self.assertEqual(Exporter().csv(datacenters(), out), 2)
+        self.assertEqual(out.getvalue().splitlines(), ['id,location,name',
+            '1,"{""city"":""bcn""}",Barcelona \xc3\xa9', '2,,Madrid'])
+
+        out = StringIO()
+        self.assertEqual(Exporter(fields=['name']).csv([], out), 0)
+        self.assertEqual(out.getvalue().splitlines(), ['name'])
+
+    def test_errors_are_raised(self):
+        def failing():
+            yield {'id': 1}
+            raise IOError('connection reset')
+        with self.assertRaises(IOError):
+            Exporter().ndjson(failing(), StringIO())
+        try:
+            Exporter().ndjson(failing(), StringIO())
+        except IOError:
+            # The traceback is the one of the producer thread
+            self.assertIn('failing', [f[2] for f in traceback.extract_tb(sys.exc_info()[2])])
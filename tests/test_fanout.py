@@ -0,0 +1,85 @@
+# Copyright (C) 2008 Abiquo Holdings S.L.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+import httpretty
+import json
+import threading
+import unittest
+
+from . import *
+from abiquo.client import ObjectDto
+from abiquo.fanout import Endpoint, FanOut
+
+class FakeClient(object):
+    """ Serves a collection without HTTP, optionally failing or waiting for an event. """
+    def __init__(self, ids, error=None, wait=None):
+        self.ids = ids
+        self.error = error
+        self.wait = wait
+        self.path = []
+
+    def __call__(self, *segments):
+        self.path.extend(segments)
+        return self
+
+    def get(self, params=None, headers=None):
+        if self.wait:
+            self.wait.wait(5)
+        if self.error:
+            raise self.error
+        return 200, ObjectDto({'collection': [{'id': id} for id in self.ids], 'links': []})
+
+    def close(self):
+        pass
+
+def endpoint(name, client):
+    endpoint = Endpoint(name, 'http://%s/api' % name)
+    endpoint.client = client
+    return endpoint
+
+class TestFanOut(unittest.TestCase):
+    def test_merged_stream(self):
+        slow = threading.Event()
+        fanout = FanOut([endpoint('eu', FakeClient([1, 2])),
+                         endpoint('us', FakeClient([3], wait=slow)),
+                         endpoint('asia', FakeClient([], error=IOError('unreachable')))])
+        items = fanout.iterate('cloud/virtualmachines')
+
+        first = [next(items) for i in range(2)]
+        self.assertEqual(sorted((t.endpoint, t.dto.id) for t in first), [('eu', 1), ('eu', 2)])
+        slow.set()
+        self.assertEqual([(t.endpoint, t.dto.id) for t in items], [('us', 3)])
+        self.assertEqual([(f.endpoint, str(f.error)) for f in fanout.failures],
+                [('asia', 'unreachable')])
+        self.assertEqual(fanout.endpoints[0].client.path, ['cloud', 'virtualmachines'])
+        fanout.close()
+
+    def test_stop_early(self):
+        fanout = FanOut([endpoint('eu', FakeClient(range(100)))])
+        items = fanout.iterate('cloud/virtualmachines', buffer=2)
+        self.assertEqual(next(items).dto.id, 0)
+        items.close()
+        fanout.close()
+
+    def test_get(self):
+        httpretty.enable()
+        try:
+            register('GET', 'http://eu/api/admin/datacenters', 200, json.dumps({'id': 1}))
+            fanout = FanOut([Endpoint('eu', 'http://eu/api', auth=('user', 'pass'), timeout=5)])
+            results = list(fanout.get('/admin/datacenters'))
+        finally:
+            httpretty.disable()
+        self.assertEqual([(r.endpoint, r.value[0], r.value[1].id) for r in results], [('eu', 200, 1)])
+        self.assertEqual(fanout.endpoints[0].client.transport.timeout, 5)
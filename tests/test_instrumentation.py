@@ -0,0 +1,80 @@
+# Copyright (C) 2008 Abiquo Holdings S.L.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+import httpretty
+import json
+import logging
+import unittest
+
+from . import *
+from abiquo.client import Abiquo
+from abiquo.instrumentation import Instrumentation, MetricsRegistry, logging_hook, url_template
+from abiquo.transport import Transport
+
+class TestInstrumentation(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        httpretty.enable()
+
+    @classmethod
+    def tearDownClass(cls):
+        httpretty.disable()
+
+    def test_url_template(self):
+        self.assertEqual(url_template('http://fake/api/admin/datacenters/12/racks?limit=2'),
+                '/api/admin/datacenters/{id}/racks')
+        self.assertEqual(url_template('http://fake/api/admin/datacenters/1/racks/2/machines/3'),
+                '/api/admin/datacenters/{id}/racks/{id}/machines/{id}')
+        self.assertEqual(url_template('http://fake/api/tasks/4a5b2c3d-1111-2222-3333-444455556666'),
+                '/api/tasks/{id}')
+
+    def test_hooks_and_metrics(self):
+        register('GET', 'http://fake/api/metrics/datacenters/1', 200, json.dumps({'name': 'dc'}))
+        register('GET', 'http://fake/api/metrics/datacenters/2', 404, '')
+
+        records = []
+        def add_header(record):
+            record.headers['X-Request-Id'] = 'abc'
+        registry = MetricsRegistry()
+        instrumentation = Instrumentation(registry=registry, before=[add_header],
+                after=[records.append, logging_hook(logging.getLogger('test'))])
+        cli = Abiquo(url="http://fake/api", transport=Transport(instrumentation=instrumentation))
+
+        code, dc = cli.metrics.datacenters(1).get()
+        assert_request(self, '/api/metrics/datacenters/1', method='GET', headers={'x-request-id': 'abc'})
+        cli.metrics.datacenters(2).get()
+
+        self.assertEqual(dc.name, 'dc')
+        self.assertEqual([r.code for r in records], [200, 404])
+        self.assertEqual(set(records[0].timings), set(['wait', 'download', 'decode', 'dto']))
+        metric = registry.snapshot()[('GET', '/api/metrics/datacenters/{id}')]
+        self.assertEqual(metric['count'], 2)
+        self.assertEqual(metric['errors'], 1)
+        self.assertIn('wait', metric['phases'])
+
+    def test_errors_are_recorded(self):
+        def fail(method, url, **kwargs):
+            raise IOError('connection reset')
+
+        records = []
+        instrumentation = Instrumentation(after=[records.append])
+        transport = Transport(instrumentation=instrumentation)
+        transport._perform = fail
+        cli = Abiquo(url="http://fake/api", transport=transport)
+
+        with self.assertRaises(IOError):
+            cli.metrics.racks.get()
+        self.assertIsInstance(records[0].error, IOError)
+        self.assertIsNone(records[0].code)
@@ -0,0 +1,104 @@
+# Copyright (C) 2008 Abiquo Holdings S.L.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+import httpretty
+import pickle
+import threading
+import unittest
+
+from . import *
+from abiquo.client import Abiquo
+from abiquo.limiter import ConcurrencyLimiter
+from abiquo.transport import Transport
+
+class TestConcurrencyLimiter(unittest.TestCase):
+    def test_grows_while_fast_and_busy(self):
+        limiter = ConcurrencyLimiter(initial=2, max_limit=3)
+        for i in range(20):
+            tokens = [limiter.acquire('api'), limiter.acquire('api')]
+            for token in tokens:
+                limiter.release('api', token, 0.1)
+        self.assertEqual(limiter.limit('api'), 3)
+
+        # An idle host does not grow
+        idle = ConcurrencyLimiter(initial=4)
+        for i in range(20):
+            idle.release('api', idle.acquire('api'), 0.1)
+        self.assertEqual(idle.limit('api'), 4)
+
+    def test_decreases_once_per_window(self):
+        limiter = ConcurrencyLimiter(initial=10, backoff=0.5)
+        limiter.release('api', limiter.acquire('api'), 0.1)
+        tokens = [limiter.acquire('api') for i in range(4)]
+        for token in tokens:
+            limiter.release('api', token, 1.0)
+        self.assertEqual(limiter.limit('api'), 5)
+
+        limiter.release('api', limiter.acquire('api'), 0.1, status=503)
+        self.assertEqual(limiter.limit('api'), 2)
+        limiter.release('api', limiter.acquire('api'), 0.1, error=True)
+        self.assertEqual(limiter.limit('api'), 1)
+        self.assertEqual(limiter.limit('other'), 10)
+
+    def test_requests_over_the_limit_wait(self):
+        limiter = ConcurrencyLimiter(initial=1)
+        token = limiter.acquire('api')
+        acquired = threading.Event()
+        def second():
+            limiter.release('api', limiter.acquire('api'), 0.1)
+            acquired.set()
+        thread = threading.Thread(target=second)
+        thread.start()
+        while limiter.queue_depth('api') == 0:
+            pass
+        self.assertEqual(limiter.stats(), {'api': {'limit': 1, 'in_flight': 1, 'waiting': 1}})
+        self.assertFalse(acquired.is_set())
+        limiter.release('api', token, 0.1)
+        self.assertTrue(acquired.wait(5))
+        thread.join()
+
+        copy = pickle.loads(pickle.dumps(limiter))
+        self.assertEqual(copy.stats(), {})
+        self.assertEqual(copy.max_limit, limiter.max_limit)
+
+    def test_transport(self):
+        limiter = ConcurrencyLimiter()
+        httpretty.enable()
+        try:
+            register('GET', 'http://fake/api/limiter/datacenters', 503, '{}')
+            api = Abiquo('http://fake/api', transport=Transport(limiter=limiter))
+            code, dto = api.limiter.datacenters.get()
+        finally:
+            httpretty.disable()
+        self.assertEqual(code, 503)
+        self.assertEqual(limiter.stats(), {'fake': {'limit': 3, 'in_flight': 0, 'waiting': 0}})
+
+    def test_streamed_body_holds_the_slot(self):
+        limiter = ConcurrencyLimiter()
+        transport = Transport(limiter=limiter)
+        httpretty.enable()
+        try:
+            register('GET', 'http://fake/api/limiter/racks', 200, '{"collection": []}')
+            response = transport.request('GET', 'http://fake/api/limiter/racks', stream=True)
+            self.assertEqual(limiter.stats()['fake']['in_flight'], 1)
+            response.content
+            self.assertEqual(limiter.stats()['fake']['in_flight'], 0)
+
+            response = transport.request('GET', 'http://fake/api/limiter/racks', stream=True)
+            response.close()
+            response.close()
+            self.assertEqual(limiter.stats()['fake']['in_flight'], 0)
+        finally:
+            httpretty.disable()
@@ -14,10 +14,13 @@
 
 import httpretty
 import json
+import pickle
+import random
+import time
 import unittest
 
 from . import *
-from abiquo.client import ObjectDto
+from abiquo.client import ObjectDto, check_response
     
 class TestObjectDto(unittest.TestCase):   
     @classmethod
@@ -92,3 +95,246 @@ class TestObjectDto(unittest.TestCase):
                 headers={'accept': 'application/vnd.abiquo.datacenter+json'})
         self.assertEqual(code, 200)
         self.assertEqual(obj.foo, obj_refresh.foo)
+
+    def test_prefetch_pages_in_order(self):
+        class SlowPages(ObjectDto):
+            def _fetch_page(self, href, offset, limit, accept):
+                time.sleep(random.random() / 100)
+                return ObjectDto({'collection': [{'id': i} for i in range(offset, min(offset + limit, 10))]})
+
+        first = SlowPages({'totalSize': 10, 'collection': [{'id': 0}, {'id': 1}],
+            'links': [{'rel': 'next', 'type': 'application/vnd.abiquo.datacenters+json',
+                       'href': 'http://fake/api/admin/datacenters?startwith=2&limit=2'}]})
+
+        self.assertEqual([dc.id for dc in first.prefetch(workers=3)], range(10))
+        self.assertEqual([dc.id for dc in first.prefetch(workers=2, window=1)], range(10))
+
+    def test_fetch_page(self):
+        register('GET', 'http://fake/api/admin/datacenters', 200,
+                json.dumps({'links': [], 'collection': [{'id': 5}]}))
+
+        page = ObjectDto({})._fetch_page('http://fake/api/admin/datacenters?by=name&startwith=2&limit=2',
+                4, 2, 'application/vnd.abiquo.datacenters+json')
+
+        assert_request(self, '/api/admin/datacenters', method='GET',
+                params={'by': 'name', 'startwith': '4', 'limit': '2'},
+                headers={'accept': 'application/vnd.abiquo.datacenters+json'})
+        self.assertEqual(page.json['collection'], [{'id': 5}])
+
+    def test_prefetch_without_total_size(self):
+        register('GET', 'http://fake/api/admin/datacenters', 200,
+                json.dumps({'links': [], 'collection': [{'id': 2}]}))
+
+        first = ObjectDto({'collection': [{'id': 1}],
+            'links': [{'rel': 'next', 'type': 'application/vnd.abiquo.datacenters+json',
+                       'href': 'http://fake/api/admin/datacenters?startwith=1&limit=1'}]})
+
+        self.assertEqual([dc.id for dc in first.prefetch()], [1, 2])
+
+    def test_find_links(self):
+        obj = ObjectDto({'links': [
+            {'rel': 'disk', 'title': 'system', 'type': 'a', 'href': 'http://fake/api/disks/1'},
+            {'rel': 'disk', 'title': 'data', 'type': 'b', 'href': 'http://fake/api/disks/2'},
+            {'rel': 'edit', 'type': 'c', 'href': 'http://fake/api/vms/1'}]})
+
+        self.assertEqual(len(obj.find_links('disk')), 2)
+        self.assertEqual(obj.find_links('disk', title='data')[0]['href'], 'http://fake/api/disks/2')
+        self.assertEqual(obj.find_links('disk', type='a')[0]['href'], 'http://fake/api/disks/1')
+        self.assertEqual(obj.find_links('nic'), [])
+        self.assertEqual(obj.follow('disk', title='data').url, 'http://fake/api/disks/2')
+        self.assertEqual(obj._extract_link('disk')['title'], 'system')
+
+    def test_links_index_invalidation(self):
+        obj = ObjectDto({'links': [{'rel': 'edit', 'type': 'c', 'href': 'http://fake/api/vms/1'}]})
+        self.assertFalse(obj._has_link('nic0'))
+
+        obj.json['links'].append({'rel': 'nic0', 'type': 'n', 'href': 'http://fake/api/nics/0'})
+        obj.invalidate_links()
+        self.assertTrue(obj._has_link('nic0'))
+
+        obj.links = [{'rel': 'self', 'type': 'c', 'href': 'http://fake/api/vms/2'}]
+        self.assertFalse(obj._has_link('edit'))
+        self.assertEqual(obj.follow('self').url, 'http://fake/api/vms/2')
+
+        obj.json['links'][0] = {'rel': 'edit', 'type': 'c', 'href': 'http://fake/api/vms/3'}
+        obj.invalidate_links()
+        self.assertTrue(obj._has_link('edit'))
+        self.assertFalse(obj._has_link('self'))
+
+        obj.json['links'] = [{'rel': 'self', 'type': 'c', 'href': 'http://fake/api/vms/4'}]
+        self.assertTrue(obj._has_link('self'))
+
+    def test_compact_items(self):
+        register('GET', 'http://fake/api/compact/datacenters', 200,
+                json.dumps({'links': [], 'collection': [{'id': 3, 'location': {'city': 'bcn'}}]}))
+
+        first = ObjectDto({'collection': [{'id': 1, 'links': [{'rel': 'edit', 'type': 'a',
+                'href': 'http://fake/api/compact/datacenters/1'}]}, {'id': 2}],
+            'links': [{'rel': 'next', 'type': 'application/vnd.abiquo.datacenters+json',
+                       'href': 'http://fake/api/compact/datacenters?startwith=2&limit=2'}]},
+            auth=('user', 'name'))
+
+        items = list(first.compact())
+        self.assertEqual([dc.id for dc in items], [1, 2, 3])
+        self.assertIs(items[0]._context, items[2]._context)
+        self.assertEqual(items[2].location.city, 'bcn')
+        self.assertEqual(items[0].follow('edit').url, 'http://fake/api/compact/datacenters/1')
+        self.assertEqual(items[0].to_dto().auth, ('user', 'name'))
+        with self.assertRaises(AttributeError):
+            items[0].name = 'foo'
+        with self.assertRaises(KeyError):
+            items[1].name
+        restored = pickle.loads(pickle.dumps(items[2], 2))
+        self.assertEqual(restored.location.city, 'bcn')
+
+    def test_identity(self):
+        self.assertIsNone(ObjectDto({'name': 'dc'}).identity())
+        self.assertIsNone(ObjectDto({'links': []}).identity())
+        obj = ObjectDto({'links': [{'rel': 'self', 'href': 'http://fake/api/dcs/1/self'},
+                                   {'rel': 'edit', 'href': 'http://fake/api/dcs/1'}]})
+        self.assertEqual(obj.identity(), 'http://fake/api/dcs/1')
+        del obj.json['links'][1]
+        obj.invalidate_links()
+        self.assertEqual(obj.identity(), 'http://fake/api/dcs/1/self')
+
+    def test_changed_fields(self):
+        obj = ObjectDto({'name': 'dc', 'location': {'city': 'bcn'}, 'links': []})
+        self.assertEqual(obj.changed_fields(), set())
+
+        obj.name = 'dc'
+        obj.location['city'] = 'mad'
+        obj.description = 'new'
+        self.assertEqual(obj.changed_fields(), set(['location', 'description']))
+        self.assertEqual(obj.changes(), {'location': {'city': 'mad'}, 'description': 'new'})
+
+        obj.location['city'] = 'bcn'
+        self.assertEqual(obj.changed_fields(), set(['description']))
+
+        del obj.json['description']
+        obj.json['name'] = 'other'
+        self.assertEqual(obj.changed_fields(), set(['name']))
+
+    def test_reads_only_track_the_attribute_read(self):
+        obj = ObjectDto({'name': 'dc', 'location': {'city': 'bcn'}, 'links': []})
+        obj.name
+        self.assertIsNone(obj._original)
+        obj.links
+        self.assertEqual(set(obj._original), set(['links']))
+
+    def test_changed_fields_of_added_attributes(self):
+        obj = ObjectDto({'links': []})
+        obj.b = 2
+        self.assertEqual(obj.changed_fields(), set(['b']))
+        del obj.json['b']
+        self.assertEqual(obj.changed_fields(), set())
+
+    def test_put_only_when_changed(self):
+        data = {'foo': 'bar', 'links': [{'rel': 'edit', 'href': 'http://fake/api/dirty/datacenters/1',
+            'type': 'application/vnd.abiquo.datacenter+json'}]}
+        httpretty.register_uri('GET', 'http://fake/api/dirty/datacenters/1', body=json.dumps(data),
+                adding_headers={'ETag': '"1"'})
+        httpretty.register_uri('PUT', 'http://fake/api/dirty/datacenters/1', body=json.dumps(data),
+                adding_headers={'ETag': '"2"'})
+
+        res, obj = api.dirty.datacenters.get(id='1')
+        self.assertEqual(obj.etag, '"1"')
+        obj.foo = 'bar'
+        check_response(200, *obj.put())
+        code, same = obj.put()
+        self.assertEqual(code, 200)
+        self.assertIs(same, obj)
+        self.assertEqual(httpretty.last_request().method, 'GET')
+
+        obj.foo = 'updated'
+        code, updated = obj.put(if_match=True)
+        assert_request(self, '/api/dirty/datacenters/1', method='PUT', headers={'if-match': '"1"'})
+        self.assertEqual(obj.changed_fields(), set())
+        self.assertEqual(obj.etag, '"2"')
+
+        code, updated = obj.put(force=True)
+        assert_request(self, '/api/dirty/datacenters/1', method='PUT')
+        self.assertNotIn('if-match', httpretty.last_request().headers)
+
+        obj.json['foo'] = 'direct'
+        obj.put()
+        self.assertEqual(json.loads(httpretty.last_request().body)['foo'], 'direct')
+
+        requests = len(httpretty.latest_requests())
+        obj.put()
+        self.assertEqual(len(httpretty.latest_requests()), requests)
+
+    def test_random_access(self):
+        requested = []
+        def page(request, uri, headers):
+            start = int(request.querystring['startwith'][0])
+            limit = int(request.querystring['limit'][0])
+            requested.append((start, limit))
+            body = {'collection': [{'id': i} for i in range(start, min(start + limit, 100))],
+                    'links': []}
+            if 'total' in request.querystring:
+                body['totalSize'] = 100
+            return (200, headers, json.dumps(body))
+        httpretty.register_uri('GET', 'http://fake/api/slice/datacenters', body=page)
+
+        first = ObjectDto({'collection': [{'id': 0}, {'id': 1}], 'totalSize': 100,
+            'links': [{'rel': 'next', 'type': 'application/vnd.abiquo.datacenters+json',
+                       'href': 'http://fake/api/slice/datacenters?startwith=2&limit=2'}]})
+        self.assertEqual(first[1].id, 1)
+        self.assertEqual(requested, [])
+        self.assertEqual(first[40].id, 40)
+        self.assertEqual(first[-1].id, 99)
+        self.assertEqual(requested, [(40, 1), (99, 1)])
+
+        del requested[:]
+        self.assertEqual([dc.id for dc in first[1:6]], [1, 2, 3, 4, 5])
+        self.assertEqual(requested, [(2, 2), (4, 2)])
+        self.assertEqual([dc.id for dc in first[96:]], [96, 97, 98, 99])
+        self.assertEqual([dc.id for dc in first[-3::-2]][:2], [97, 95])
+        with self.assertRaises(IndexError):
+            first[100]
+
+        del requested[:]
+        untold = ObjectDto({'collection': [{'id': 0}, {'id': 1}],
+            'links': [{'rel': 'next', 'type': 'application/vnd.abiquo.datacenters+json',
+                       'href': 'http://fake/api/slice/datacenters?startwith=2&limit=2&total=1'}]})
+        self.assertEqual(len(untold), 2)
+        self.assertEqual(untold.count(), 100)
+        self.assertEqual(requested, [(0, 1)])
+
+    def test_expand_links(self):
+        requested = []
+        class Linked(ObjectDto):
+            def _item(self, json):
+                return Linked(json)
+
+            def _get(self, url, accept):
+                requested.append(url)
+                time.sleep(random.random() / 100)
+                if url.endswith('missing'):
+                    return 404, None
+                if url.endswith('broken'):
+                    raise IOError('connection reset')
+                return 200, ObjectDto({'href': url})
+
+        def vm(id, profile):
+            return {'id': id, 'links': [
+                {'rel': 'state', 'type': 's', 'href': 'http://fake/api/vms/%s/state' % id},
+                {'rel': 'hardwareprofile', 'type': 'h', 'href': 'http://fake/api/profiles/%s' % profile}]}
+
+        vms = Linked({'collection': [vm(1, 'small'), vm(2, 'large'), vm(3, 'small'),
+            {'id': 4, 'links': [{'rel': 'state', 'type': 's', 'href': 'http://fake/api/missing'}]},
+            {'id': 5, 'links': [{'rel': 'state', 'type': 's', 'href': 'http://fake/api/broken'}]}],
+            'links': []})
+
+        href = lambda dto: dto.href if dto is not None else None
+        expanded = [(vm.id, href(state), href(profile))
+                    for vm, state, profile in vms.expand(['state', 'hardwareprofile'], workers=3, window=2)]
+        self.assertEqual(expanded, [
+            (1, 'http://fake/api/vms/1/state', 'http://fake/api/profiles/small'),
+            (2, 'http://fake/api/vms/2/state', 'http://fake/api/profiles/large'),
+            (3, 'http://fake/api/vms/3/state', 'http://fake/api/profiles/small'),
+            (4, None, None),
+            (5, None, None)])
+        self.assertEqual(requested.count('http://fake/api/profiles/small'), 1)
+        self.assertEqual(len(requested), 7)
+        self.assertEqual([item.id for item, state in vms.expand('state', shared=1)], [1, 2, 3, 4, 5])
@@ -0,0 +1,99 @@
+# Copyright (C) 2008 Abiquo Holdings S.L.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+import httpretty
+import json
+import multiprocessing
+import time
+import unittest
+
+from . import *
+from abiquo.client import Abiquo, CompactDto, ObjectDto
+from abiquo.processes import ProcessPool
+from abiquo.retry import RetryPolicy
+from abiquo.transport import Transport
+
+URL = 'http://fake/api/processes/datacenters'
+TYPE = 'application/vnd.abiquo.datacenters+json'
+
+def page(request, uri, headers):
+    start = int(request.querystring['startwith'][0])
+    limit = int(request.querystring['limit'][0])
+    body = {'totalSize': 10, 'links': [], 'collection': [{'id': i, 'links': [
+        {'rel': 'racks', 'type': 'r', 'href': '%s/%s/racks' % (URL, i % 2)}]}
+        for i in range(start, min(start + limit, 10))]}
+    return (200, headers, json.dumps(body))
+
+def racks(request, uri, headers):
+    if uri.endswith('/1/racks'):
+        return (500, headers, '{}')
+    return (200, headers, json.dumps({'links': [], 'collection': [{'id': 'rack'}]}))
+
+def name(json):
+    return 'dc-%s' % json['id']
+
+class TestProcessPool(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        httpretty.enable()
+        httpretty.register_uri('GET', URL, body=page)
+        httpretty.register_uri('GET', '%s/0/racks' % URL, body=racks)
+        httpretty.register_uri('GET', '%s/1/racks' % URL, body=racks)
+        # Workers are forked after the fake responses are registered
+        cls.pool = ProcessPool(Abiquo(api.url, auth=api.auth, transport=Transport(timeout=10,
+                retry=RetryPolicy(retries=20), host_limits={'fake': 4})), processes=2)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.pool.close()
+        httpretty.disable()
+
+    def first(self):
+        return ObjectDto({'totalSize': 10, 'collection': [{'id': 0}, {'id': 1}],
+            'links': [{'rel': 'next', 'type': TYPE, 'href': '%s?startwith=2&limit=3' % URL}]})
+
+    def test_listing(self):
+        items = list(self.pool.listing(self.first(), window=1))
+        self.assertEqual([dc.id for dc in items], range(10))
+        self.assertIsInstance(items[5], CompactDto)
+        self.assertEqual(list(self.pool.listing(self.first(), process=name))[-1], 'dc-9')
+
+    def test_crawl(self):
+        root = ObjectDto({'links': [{'rel': 'datacenters', 'type': TYPE, 'href': '%s?startwith=0&limit=10' % URL}]})
+        results = list(self.pool.crawl(root, ['datacenters', 'racks'], workers=1, chunk=3))
+        self.assertEqual(len([dc for rels, dc in results if rels == ('datacenters',)]), 10)
+        self.assertEqual([rack.id for rels, rack in results if rels == ('datacenters', 'racks')], ['rack'])
+        self.assertEqual([(f.href, f.code) for f in self.pool.failures], [('%s/1/racks' % URL, 500)])
+
+    def test_crawl_stops_workers(self):
+        root = ObjectDto({'links': [{'rel': 'datacenters', 'type': TYPE, 'href': '%s?startwith=0&limit=10' % URL}]})
+        crawl = self.pool.crawl(root, ['datacenters'], workers=1, chunk=1)
+        rels, first = next(crawl)
+        crawl.close()
+        for i in range(100):
+            if not [p for p in multiprocessing.active_children() if not p.name.startswith('PoolWorker')]:
+                break
+            time.sleep(0.05)
+        else:
+            self.fail('the shard process did not stop')
+        self.assertEqual(len(list(self.pool.crawl(root, ['datacenters'], workers=1))), 10)
+
+    def test_workers_use_the_transport_settings(self):
+        self.assertEqual(self.pool.pool.apply(worker_settings), (10, 20, {'fake': 4}))
+
+def worker_settings():
+    from abiquo import processes
+    transport = processes._worker.transport
+    return transport.timeout, transport.retry.retries, transport.host_limits
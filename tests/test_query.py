@@ -0,0 +1,83 @@
+# Copyright (C) 2008 Abiquo Holdings S.L.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+import httpretty
+import json
+import unittest
+
+from . import *
+from abiquo.paging import AdaptivePageSize
+from abiquo.query import Query
+
+URL = 'http://fake/api/query/datacenters'
+TYPE = 'application/vnd.abiquo.datacenters+json'
+
+def pages(total, requested):
+    def page(request, uri, headers):
+        start = int(request.querystring.get('startwith', ['0'])[0])
+        limit = int(request.querystring.get('limit', ['2'])[0])
+        requested.append(limit)
+        body = {'collection': [{'id': i} for i in range(start, min(start + limit, total))],
+                'totalSize': total, 'links': []}
+        if start + limit < total:
+            body['links'].append({'rel': 'next', 'type': TYPE,
+                'href': '%s?startwith=%s&limit=%s' % (URL, start + limit, limit)})
+        return (200, headers, json.dumps(body))
+    return page
+
+class TestQuery(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        httpretty.enable()
+
+    @classmethod
+    def tearDownClass(cls):
+        httpretty.disable()
+
+    def test_parameters(self):
+        register('GET', URL, 200, json.dumps({'collection': [{'id': 1}], 'links': []}))
+
+        base = Query(api.query.datacenters, accept=TYPE)
+        query = base.has('bcn').order_by('name', asc=False).limit(50).offset(100).where(enterprise=2)
+        self.assertEqual(base.params, {})
+        self.assertEqual([dc.id for dc in query], [1])
+        assert_request(self, '/api/query/datacenters', method='GET', headers={'accept': TYPE},
+                params={'has': 'bcn', 'by': 'name', 'asc': 'false', 'limit': '50',
+                        'startwith': '100', 'enterprise': '2'})
+
+    def test_adaptive_page_size(self):
+        requested = []
+        httpretty.register_uri('GET', URL, body=pages(100, requested))
+
+        items = list(Query(api.query.datacenters, accept=TYPE).limit(2).adaptive(max_limit=32))
+        self.assertEqual([dc.id for dc in items], range(100))
+        self.assertEqual(requested, [2, 2, 4, 8, 16, 32, 32, 32])
+
+    def test_count(self):
+        requested = []
+        httpretty.register_uri('GET', URL, body=pages(100, requested))
+
+        self.assertEqual(Query(api.query.datacenters, accept=TYPE).has('bcn').count(), 100)
+        assert_request(self, '/api/query/datacenters', params={'limit': '1', 'has': 'bcn'})
+        self.assertEqual(requested, [1])
+
+    def test_page_size_bounds(self):
+        sizer = AdaptivePageSize(100, latency=1.0, budget=1000, max_limit=500)
+        sizer.sized(10, 200)
+        self.assertEqual(sizer.limit, 50)
+        self.assertEqual(sizer.observe(50, 0.1), 50)
+        self.assertEqual(sizer.observe(50, 3), 25)
+        self.assertEqual(sizer.observe(25, 1.5), 25)
+        self.assertEqual(sizer.observe(10, 0.1), 25)
@@ -0,0 +1,74 @@
+# Copyright (C) 2008 Abiquo Holdings S.L.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+import httpretty
+import json
+import os
+import tempfile
+import unittest
+
+from . import *
+from abiquo.client import Abiquo
+from abiquo.replay import RecordingTransport, ReplayTransport
+
+TYPE = 'application/vnd.abiquo.datacenters+json'
+
+def page(start):
+    body = {'collection': [{'id': start}], 'links': []}
+    if start < 1:
+        body['links'].append({'rel': 'next', 'type': TYPE,
+            'href': 'http://fake/api/replay/datacenters?limit=1&startwith=%s' % (start + 1)})
+    return json.dumps(body)
+
+class TestReplay(unittest.TestCase):
+    def setUp(self):
+        self.path = os.path.join(tempfile.mkdtemp(), 'session.cassette')
+
+    def record(self):
+        httpretty.enable()
+        try:
+            httpretty.register_uri('GET', 'http://fake/api/replay/datacenters',
+                    body=lambda request, uri, headers: (200, headers,
+                        page(int(request.querystring.get('startwith', ['0'])[0]))))
+            transport = RecordingTransport(self.path, base='http://fake/api')
+            api = Abiquo('http://fake/api', auth=('user', 'pass'), transport=transport)
+            code, datacenters = api.replay.datacenters.get(headers={'accept': TYPE})
+            ids = [dc.id for dc in datacenters]
+            api.close()
+        finally:
+            httpretty.disable()
+        return ids
+
+    def test_record_and_replay(self):
+        self.assertEqual(self.record(), [0, 1])
+
+        slept = []
+        transport = ReplayTransport(self.path, base='http://local/api', realtime=True,
+                sleep=slept.append)
+        api = Abiquo('http://local/api', transport=transport)
+        for i in range(2):
+            code, datacenters = api.replay.datacenters.get(headers={'accept': TYPE})
+            self.assertEqual(code, 200)
+            self.assertEqual(datacenters._extract_link('next')['href'],
+                    'http://local/api/replay/datacenters?limit=1&startwith=1')
+            self.assertEqual([dc.id for dc in datacenters], [0, 1])
+        self.assertEqual(transport.replayed, 4)
+        self.assertEqual(len(slept), 4)
+
+        streamed = api.replay.datacenters.stream(headers={'accept': TYPE}, chunk_size=8)
+        self.assertEqual([dc.id for dc in streamed], [0, 1])
+
+        with self.assertRaises(LookupError):
+            api.replay.racks.get(headers={'accept': TYPE})
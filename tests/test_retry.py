@@ -0,0 +1,98 @@
+# Copyright (C) 2008 Abiquo Holdings S.L.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+import httpretty
+import json
+import unittest
+
+from . import *
+from abiquo.client import Abiquo, ObjectDto
+from abiquo.retry import RetryPolicy, parse_retry_after
+from abiquo.transport import Transport
+
+class TestRetry(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        httpretty.enable()
+
+    @classmethod
+    def tearDownClass(cls):
+        httpretty.disable()
+
+    def setUp(self):
+        self.delays = []
+        self.retry = RetryPolicy(retries=3, sleep=self.delays.append)
+        self.api = Abiquo(url="http://fake/api", transport=Transport(retry=self.retry))
+
+    def flaky(self, method, uri, failures, status=503, body='{}', headers=None):
+        calls = []
+        def respond(request, uri, response_headers):
+            calls.append(uri)
+            if len(calls) <= failures:
+                response_headers.update(headers or {})
+                return (status, response_headers, '')
+            return (200, response_headers, body)
+        httpretty.register_uri(method, uri, body=respond)
+        return calls
+
+    def test_retries_idempotent_requests(self):
+        calls = self.flaky('GET', 'http://fake/api/retry/datacenters/1', 2, body='{"name": "dc"}')
+
+        code, dc = self.api.retry.datacenters(1).get()
+
+        self.assertEqual(code, 200)
+        self.assertEqual(dc.name, 'dc')
+        self.assertEqual(len(calls), 3)
+        self.assertEqual(self.retry.retried, 2)
+        self.assertTrue(all(0 <= d <= 1.0 for d in self.delays))
+
+    def test_gives_up(self):
+        calls = self.flaky('DELETE', 'http://fake/api/retry/racks/1', 10)
+
+        code, dto = self.api.retry.racks(1).delete()
+
+        self.assertEqual(code, 503)
+        self.assertEqual(len(calls), 4)
+
+    def test_non_idempotent_requests(self):
+        calls = self.flaky('POST', 'http://fake/api/retry/racks', 1, status=503)
+        code, dto = self.api.retry.racks.post()
+        self.assertEqual(code, 503)
+        self.assertEqual(len(calls), 1)
+
+        calls = self.flaky('POST', 'http://fake/api/retry/machines', 1, status=429,
+                headers={'retry-after': '7'})
+        code, dto = self.api.retry.machines.post()
+        self.assertEqual(code, 200)
+        self.assertEqual(len(calls), 2)
+        self.assertEqual(self.delays, [7])
+
+    def test_retries_in_the_middle_of_pagination(self):
+        first_page = self.flaky('GET', 'http://fake/api/retry/enterprises', 0,
+                body=json.dumps({'links': [], 'collection': [{'id': 1}]}))
+        second_page = self.flaky('GET', 'http://fake/api/retry/enterprises/page2', 1,
+                body=json.dumps({'links': [], 'collection': [{'id': 3}]}))
+
+        collection = ObjectDto({'collection': [{'id': 0}], 'links': [{'rel': 'next', 'type': 'a',
+            'href': 'http://fake/api/retry/enterprises/page2'}]}, transport=self.api.transport)
+
+        self.assertEqual([e.id for e in collection], [0, 3])
+        self.assertEqual(len(first_page), 0)
+        self.assertEqual(len(second_page), 2)
+
+    def test_parse_retry_after(self):
+        self.assertEqual(parse_retry_after('120'), 120)
+        self.assertEqual(parse_retry_after('Wed, 21 Oct 2015 07:28:00 GMT'), 0)
+        self.assertIsNone(parse_retry_after('soon'))
@@ -0,0 +1,123 @@
+# Copyright (C) 2008 Abiquo Holdings S.L.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+import httpretty
+import threading
+import time
+import unittest
+
+from . import *
+from abiquo.client import Abiquo
+from abiquo.singleflight import SingleFlight, request_key
+from abiquo.transport import Transport
+
+class TestSingleFlight(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        httpretty.enable()
+
+    @classmethod
+    def tearDownClass(cls):
+        httpretty.disable()
+
+    def run_concurrently(self, flight, key, call, count):
+        results = []
+        def worker():
+            try:
+                results.append(flight.do(key, call))
+            except Exception as e:
+                results.append(e)
+        threads = [threading.Thread(target=worker) for i in range(count)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return results
+
+    def test_coalesces_concurrent_calls(self):
+        calls = []
+        def call():
+            calls.append(1)
+            time.sleep(0.05)
+            return object()
+
+        flight = SingleFlight()
+        results = self.run_concurrently(flight, 'key', call, 5)
+
+        self.assertEqual(len(calls), 1)
+        self.assertTrue(all(r is results[0] for r in results))
+        self.assertEqual(flight.stats(), {'calls': 1, 'coalesced': 4})
+
+    def test_errors_are_shared(self):
+        def call():
+            time.sleep(0.05)
+            raise ValueError('boom')
+
+        results = self.run_concurrently(SingleFlight(), 'key', call, 3)
+
+        self.assertTrue(all(isinstance(r, ValueError) for r in results))
+
+    def test_request_key(self):
+        key = request_key('http://fake/api', {'b': 2, 'a': 1}, {'Accept': 'x'}, ('u', 'p'))
+        self.assertEqual(key, request_key('http://fake/api', {'a': 1, 'b': 2}, {'accept': 'x'}, ('u', 'p')))
+        self.assertNotEqual(key, request_key('http://fake/api', {'a': 1, 'b': 2},
+                {'accept': 'x', 'X-Id': '1'}, ('u', 'p')))
+        self.assertNotEqual(key, request_key('http://fake/api', {'a': 1, 'b': 2},
+                {'accept': 'x', 'Authorization': 'Bearer t'}, ('u', 'p')))
+        self.assertNotEqual(request_key('http://fake/api', {'has': ['a', 'b']}),
+                request_key('http://fake/api', {'has': ['a', 'c']}))
+        self.assertNotEqual(key, request_key('http://fake/api', {'a': 1, 'b': 2}, {'accept': 'y'}, ('u', 'p')))
+        self.assertNotEqual(key, request_key('http://fake/api', {'a': 1, 'b': 2}, {'accept': 'x'}, ('u', 'q')))
+        self.assertNotEqual(key, request_key('http://fake/api', {'a': 1, 'b': 2},
+                {'accept': 'x', 'If-None-Match': '"1"'}, ('u', 'p')))
+
+    def test_transport_coalesces_gets(self):
+        register('GET', 'http://fake/api/flight/datacenters', 200, '{"name": "dc"}')
+        register('POST', 'http://fake/api/flight/datacenters', 201, '{}')
+
+        flight = SingleFlight()
+        cli = Abiquo(url="http://fake/api", transport=Transport(single_flight=flight))
+        code, dc = cli.flight.datacenters.get()
+        cli.flight.datacenters.post()
+
+        self.assertEqual(dc.name, 'dc')
+        self.assertEqual(flight.calls, 1)
+
+    def test_transport_coalesces_concurrent_gets(self):
+        sent = []
+        def perform(method, url, **kwargs):
+            sent.append(kwargs['headers'].get('Authorization'))
+            time.sleep(0.05)
+            return FakeResponse()
+
+        flight = SingleFlight()
+        transport = Transport(single_flight=flight)
+        transport._perform = perform
+        responses = []
+        def get(token):
+            responses.append(transport.request('GET', 'http://fake/api/flight/racks',
+                    params={'has': ['a', 'b']}, headers={'Authorization': token}))
+        threads = [threading.Thread(target=get, args=(t,)) for t in ['a', 'a', 'a', 'b', 'b']]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(sorted(sent), ['a', 'b'])
+        self.assertEqual(len(set(responses)), 2)
+        self.assertEqual(flight.stats(), {'calls': 2, 'coalesced': 3})
+
+class FakeResponse(object):
+    content = '{}'
@@ -0,0 +1,89 @@
+# Copyright (C) 2008 Abiquo Holdings S.L.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+import httpretty
+import json
+import unittest
+
+from . import *
+from abiquo.stream import CollectionParser
+
+class TestStream(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        httpretty.enable()
+
+    @classmethod
+    def tearDownClass(cls):
+        httpretty.disable()
+
+    def chunks(self, data, size):
+        return [data[i:i + size] for i in range(0, len(data), size)]
+
+    def test_parse_in_small_chunks(self):
+        document = {'links': [{'rel': 'next', 'href': 'http://fake'}],
+                    'collection': [{'id': i, 'name': u'dc \xe9 %s' % i} for i in range(20)],
+                    'totalSize': 123456}
+        data = json.dumps(document, ensure_ascii=False).encode('utf-8')
+        for size in (1, 3, 7, 1024):
+            parser = CollectionParser(self.chunks(data, size))
+            self.assertEqual(list(parser), document['collection'])
+            self.assertEqual(parser.meta['totalSize'], 123456)
+            self.assertEqual(parser.meta['links'], document['links'])
+
+    def test_scalars_split_between_chunks(self):
+        data = '{"collection":[1, 2.5, 123456, -1.5e-3, 4E+10, true, null],"totalSize":5}'
+        for size in (1, 2, 3):
+            parser = CollectionParser(self.chunks(data, size))
+            self.assertEqual(list(parser), [1, 2.5, 123456, -1.5e-3, 4E+10, True, None])
+            self.assertEqual(parser.meta['totalSize'], 5)
+
+    def test_items_are_yielded_before_the_end(self):
+        received = []
+        def chunks():
+            received.append('head')
+            yield '{"collection": [{"id": 1}, '
+            received.append('tail')
+            yield '{"id": 2}]}'
+
+        items = iter(CollectionParser(chunks()))
+        self.assertEqual(next(items), {'id': 1})
+        self.assertEqual(received, ['head'])
+        self.assertEqual(list(items), [{'id': 2}])
+
+    def test_truncated_document(self):
+        with self.assertRaises(ValueError):
+            list(CollectionParser(['{"collection": [{"id": 1}, {"id"']))
+
+    def test_stream_pages(self):
+        register('GET', 'http://fake/api/streaming/datacenters', 200, json.dumps({
+            'collection': [{'id': 1}],
+            'links': [{'rel': 'next', 'type': 'application/vnd.abiquo.datacenters+json',
+                       'href': 'http://fake/api/streaming/datacenters/page2'}]}))
+        register('GET', 'http://fake/api/streaming/datacenters/page2', 200, json.dumps({
+            'collection': [{'id': 2}], 'links': []}))
+
+        items = list(api.streaming.datacenters.stream(chunk_size=4))
+
+        self.assertEqual([dc.id for dc in items], [1, 2])
+        assert_request(self, '/api/streaming/datacenters/page2', method='GET',
+                headers={'accept': 'application/vnd.abiquo.datacenters+json'})
+
+    def test_stream_error(self):
+        register('GET', 'http://fake/api/streaming/racks', 404, json.dumps({
+            'collection': [{'code': 'RACK-0', 'message': 'not found'}]}))
+
+        with self.assertRaises(Exception):
+            list(api.streaming.racks.stream())
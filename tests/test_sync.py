@@ -0,0 +1,92 @@
+# Copyright (C) 2008 Abiquo Holdings S.L.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+import httpretty
+import json
+import os
+import tempfile
+import unittest
+
+from . import *
+from abiquo.sync import Sync, SyncIndex
+
+URL = 'http://fake/api/sync/%s'
+TYPE = 'application/vnd.abiquo.virtualmachines+json'
+
+def vm(id, state='ON'):
+    return {'id': id, 'state': state,
+            'links': [{'rel': 'edit', 'href': 'http://fake/api/vms/%s' % id, 'type': 'vm'}]}
+
+class FakeCollection(object):
+    """ Serves two pages of virtual machines with an ETag per page. """
+    def __init__(self, name, vms):
+        self.url = URL % name
+        self.vms = vms
+        self.requests = []
+
+    def __call__(self, request, uri, headers):
+        start = int(request.querystring.get('startwith', ['0'])[0])
+        page = self.vms[start:start + 2]
+        body = {'collection': page, 'links': []}
+        if start + 2 < len(self.vms):
+            body['links'].append({'rel': 'next', 'type': TYPE,
+                                  'href': '%s?startwith=%s' % (self.url, start + 2)})
+        etag = '"%s"' % hash(json.dumps(body, sort_keys=True))
+        headers['etag'] = etag
+        self.requests.append(start)
+        if request.headers.get('if-none-match') == etag:
+            return (304, headers, '')
+        return (200, headers, json.dumps(body))
+
+class TestSync(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        httpretty.enable()
+
+    @classmethod
+    def tearDownClass(cls):
+        httpretty.disable()
+
+    def changes(self, sync, name):
+        return sorted((c.kind, c.href.rsplit('/', 1)[1]) for c in sync.run(api.sync(name), TYPE))
+
+    def test_changes(self):
+        collection = FakeCollection('changes', [vm(1), vm(2), vm(3)])
+        httpretty.register_uri('GET', collection.url, body=collection)
+
+        sync = Sync()
+        self.assertEqual(self.changes(sync, 'changes'),
+                [('added', '1'), ('added', '2'), ('added', '3')])
+        self.assertEqual(self.changes(sync, 'changes'), [])
+        self.assertEqual(sync.not_modified, 2)
+
+        collection.vms = [vm(1), vm(3, 'OFF'), vm(4)]
+        self.assertEqual(self.changes(sync, 'changes'),
+                [('added', '4'), ('changed', '3'), ('removed', '2')])
+        self.assertEqual(sync.not_modified, 2)
+
+    def test_persistent_index(self):
+        collection = FakeCollection('persistent', [vm(1), vm(2), vm(3)])
+        httpretty.register_uri('GET', collection.url, body=collection)
+
+        sync = Sync()
+        self.changes(sync, 'persistent')
+        path = os.path.join(tempfile.mkdtemp(), 'index')
+        sync.index.save(path)
+
+        restored = Sync(SyncIndex.load(path))
+        self.assertEqual(self.changes(restored, 'persistent'), [])
+        self.assertEqual(restored.not_modified, 2)
+        self.assertEqual(len(restored.index.items), 3)
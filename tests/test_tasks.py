@@ -0,0 +1,89 @@
+# Copyright (C) 2008 Abiquo Holdings S.L.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+import httpretty
+import json
+import unittest
+
+from . import *
+from abiquo.client import ObjectDto
+from abiquo.tasks import TaskPoller
+
+TASKS = 'http://fake/api/tasks/virtualmachines/1/tasks'
+
+def task(id, state):
+    return {'taskId': id, 'state': state,
+            'links': [{'rel': 'self', 'href': '%s/%s' % (TASKS, id),
+                       'type': 'application/vnd.abiquo.task+json'}]}
+
+class TestTaskPoller(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        httpretty.enable()
+
+    @classmethod
+    def tearDownClass(cls):
+        httpretty.disable()
+
+    def test_group_is_polled_as_collection(self):
+        polls = []
+        def collection(request, uri, headers):
+            polls.append(request.headers['accept'])
+            body = {'collection': [task('a', 'STARTED'), task('b', 'FINISHED_SUCCESSFULLY')],
+                    'links': []}
+            return (200, headers, json.dumps(body))
+        def single(request, uri, headers):
+            polls.append(request.headers['accept'])
+            return (200, headers, json.dumps(task('a', 'FINISHED_UNSUCCESSFULLY')))
+        httpretty.register_uri('GET', TASKS, body=collection)
+        httpretty.register_uri('GET', '%s/a' % TASKS, body=single)
+
+        poller = TaskPoller(api, interval=0.01, rate=1000)
+        finished = []
+        first = poller.watch('%s/a' % TASKS, callback=finished.append)
+        second = poller.watch(ObjectDto(task('b', 'STARTED')))
+
+        self.assertEqual(second.result(timeout=5).state, 'FINISHED_SUCCESSFULLY')
+        self.assertEqual(first.result(timeout=5).state, 'FINISHED_UNSUCCESSFULLY')
+        self.assertEqual(finished, [first])
+        # Once a single task is left it is polled directly
+        self.assertEqual(polls, ['application/vnd.abiquo.tasks+json',
+                                 'application/vnd.abiquo.task+json'])
+        self.assertEqual(poller.requests, 2)
+        self.assertEqual(poller.pending(), 0)
+
+    def test_single_task_is_polled_directly(self):
+        states = iter(['QUEUEING', 'STARTED', 'FINISHED_SUCCESSFULLY'])
+        httpretty.register_uri('GET', '%s/c' % TASKS,
+                body=lambda request, uri, headers: (200, headers, json.dumps(task('c', next(states)))))
+        httpretty.register_uri('GET', '%s/missing' % TASKS, status=404, body='{}')
+
+        poller = TaskPoller(api, interval=0.01, rate=1000)
+        accepted = ObjectDto({'links': [{'rel': 'status', 'href': '%s/c' % TASKS,
+                                         'type': 'application/vnd.abiquo.task+json'}]})
+        done = poller.watch(accepted)
+        self.assertEqual(done.result(timeout=5).taskId, 'c')
+        self.assertEqual(poller.requests, 3)
+
+        missing = poller.watch('%s/missing' % TASKS)
+        self.assertIsNotNone(missing.exception(timeout=5))
+
+    def test_close_fails_pending_tasks(self):
+        poller = TaskPoller(api, interval=60)
+        future = poller.watch('%s/d' % TASKS)
+        poller.close()
+        self.assertIsInstance(future.exception(timeout=1), RuntimeError)
+        with self.assertRaises(RuntimeError):
+            poller.watch('%s/e' % TASKS)
@@ -0,0 +1,54 @@
+# Copyright (C) 2008 Abiquo Holdings S.L.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import httpretty
+import unittest
+
+from . import *
+from abiquo.client import Abiquo
+from abiquo.transport import Transport
+
+class TestTransport(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        httpretty.enable()
+
+    @classmethod
+    def tearDownClass(cls):
+        httpretty.disable()
+
+    def test_pool_configuration(self):
+        transport = Transport(pool_connections=2, pool_maxsize=20, pool_block=True)
+        adapter = transport.session.get_adapter('http://fake/api')
+        self.assertEqual(adapter._pool_connections, 2)
+        self.assertEqual(adapter._pool_maxsize, 20)
+        self.assertTrue(adapter._pool_block)
+
+    def test_host_limits(self):
+        transport = Transport(pool_maxsize=20, host_limits={'fake': 4})
+        limited = transport.session.get_adapter('https://fake/api')
+        self.assertEqual(limited._pool_maxsize, 4)
+        self.assertTrue(limited._pool_block)
+        other = transport.session.get_adapter('https://other/api')
+        self.assertEqual(other._pool_maxsize, 20)
+        self.assertFalse(other._pool_block)
+        prefixed = transport.session.get_adapter('https://fake-eu/api')
+        self.assertEqual(prefixed._pool_maxsize, 20)
+
+    def test_keep_alive(self):
+        register('GET', 'http://fake/api/admin', 200, '{}')
+
+        cli = Abiquo(url="http://fake/api", transport=Transport(keep_alive=False))
+        cli.admin.get()
+        assert_request(self, '/api/admin', method='GET', headers={'connection': 'close'})